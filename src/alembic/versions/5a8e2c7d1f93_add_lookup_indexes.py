@@ -0,0 +1,32 @@
+"""Add indexes for word lookup, review queue and foreign keys
+
+Revision ID: 5a8e2c7d1f93
+Revises: c3f9a1d2e4b6
+Create Date: 2026-10-18 00:12:09.318274
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '5a8e2c7d1f93'
+down_revision = 'c3f9a1d2e4b6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Функциональный индекс поддерживают и SQLite (с 3.9), и PostgreSQL.
+    op.create_index('ix_words_word_lower', 'words', [sa.text('lower(word)')])
+    op.create_index('ix_word_progress_next_review_at', 'word_progress', ['next_review_at'])
+    op.create_index('ix_word_progress_word_id', 'word_progress', ['word_id'])
+    op.create_index('ix_examples_word_id', 'examples', ['word_id'])
+
+
+def downgrade():
+    op.drop_index('ix_examples_word_id', table_name='examples')
+    op.drop_index('ix_word_progress_word_id', table_name='word_progress')
+    op.drop_index('ix_word_progress_next_review_at', table_name='word_progress')
+    op.drop_index('ix_words_word_lower', table_name='words')
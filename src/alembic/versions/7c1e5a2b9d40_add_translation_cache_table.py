@@ -0,0 +1,37 @@
+"""Add translation_cache table
+
+Revision ID: 7c1e5a2b9d40
+Revises: 38de4d9f334e
+Create Date: 2026-10-17 10:12:04.512930
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '7c1e5a2b9d40'
+down_revision = '38de4d9f334e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'translation_cache',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('key', sa.String(length=64), nullable=False),
+        sa.Column('prompt_hash', sa.String(length=64), nullable=False),
+        sa.Column('message', sa.Text(), nullable=True),
+        sa.Column('words', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('key'),
+    )
+    op.create_index('ix_translation_cache_prompt_hash', 'translation_cache', ['prompt_hash'])
+
+
+def downgrade():
+    op.drop_index('ix_translation_cache_prompt_hash', table_name='translation_cache')
+    op.drop_table('translation_cache')
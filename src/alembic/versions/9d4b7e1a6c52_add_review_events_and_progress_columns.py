@@ -0,0 +1,116 @@
+"""Move review history to review_events, add repetitions and last_reviewed_at to word_progress
+
+Revision ID: 9d4b7e1a6c52
+Revises: 5a8e2c7d1f93
+Create Date: 2026-10-17 21:40:27.514093
+
+"""
+
+import json
+from datetime import datetime, timezone
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '9d4b7e1a6c52'
+down_revision = '5a8e2c7d1f93'
+branch_labels = None
+depends_on = None
+
+review_events = sa.table(
+    'review_events',
+    sa.column('word_progress_id', sa.Integer),
+    sa.column('success', sa.Boolean),
+    sa.column('reviewed_at', sa.DateTime(timezone=True)),
+)
+word_progress = sa.table(
+    'word_progress',
+    sa.column('id', sa.Integer),
+    sa.column('review_history', sa.JSON),
+    sa.column('repetitions', sa.Integer),
+    sa.column('last_reviewed_at', sa.DateTime(timezone=True)),
+)
+
+
+def to_iso(date: datetime) -> str:
+    # SQLite возвращает даты без часового пояса, хотя записываются они в UTC.
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return date.isoformat()
+
+
+def upgrade():
+    op.create_table(
+        'review_events',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('word_progress_id', sa.Integer(), nullable=False),
+        sa.Column('success', sa.Boolean(), nullable=True),
+        sa.Column('reviewed_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['word_progress_id'], ['word_progress.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_review_events_word_progress_id', 'review_events', ['word_progress_id'])
+    op.add_column('word_progress', sa.Column('repetitions', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('word_progress', sa.Column('last_reviewed_at', sa.DateTime(timezone=True), nullable=True))
+
+    # review_history хранил даты ответов с последней ошибки: первая запись — ошибка или первый успех
+    # (исход неизвестен), остальные — успехи.
+    conn = op.get_bind()
+    rows = conn.execute(sa.select(word_progress.c.id, word_progress.c.review_history)).all()
+    for progress_id, history in rows:
+        if isinstance(history, str):
+            history = json.loads(history)
+        dates = [datetime.fromisoformat(value) for value in history or []]
+        if not dates:
+            continue
+        op.bulk_insert(
+            review_events,
+            [
+                {'word_progress_id': progress_id, 'success': None if index == 0 else True, 'reviewed_at': date}
+                for index, date in enumerate(dates)
+            ],
+        )
+        conn.execute(
+            word_progress.update()
+            .where(word_progress.c.id == progress_id)
+            .values(repetitions=len(dates), last_reviewed_at=dates[-1])
+        )
+
+    op.drop_column('word_progress', 'review_history')
+
+
+def downgrade():
+    # Временное значение по умолчанию нужно, чтобы добавить NOT NULL-колонку к таблице с данными.
+    op.add_column('word_progress', sa.Column('review_history', sa.JSON(), server_default='[]', nullable=False))
+
+    # Восстанавливаем историю из последних `repetitions` событий каждого прогресса.
+    conn = op.get_bind()
+    progress_rows = conn.execute(
+        sa.select(word_progress.c.id, word_progress.c.repetitions).where(word_progress.c.repetitions > 0)
+    ).all()
+    for progress_id, repetitions in progress_rows:
+        dates = (
+            conn.execute(
+                sa.select(review_events.c.reviewed_at)
+                .where(review_events.c.word_progress_id == progress_id)
+                .order_by(review_events.c.reviewed_at.desc())
+                .limit(repetitions)
+            )
+            .scalars()
+            .all()
+        )
+        conn.execute(
+            word_progress.update()
+            .where(word_progress.c.id == progress_id)
+            .values(review_history=[to_iso(date) for date in reversed(dates)])
+        )
+
+    op.drop_index('ix_review_events_word_progress_id', table_name='review_events')
+    op.drop_table('review_events')
+    # В SQLite batch-режим пересобирает таблицу один раз для всех изменений.
+    with op.batch_alter_table('word_progress') as batch_op:
+        batch_op.alter_column('review_history', existing_type=sa.JSON(), server_default=None)
+        batch_op.drop_column('last_reviewed_at')
+        batch_op.drop_column('repetitions')
@@ -0,0 +1,40 @@
+"""Add translation_jobs table
+
+Revision ID: b4d2f8e61a37
+Revises: 7c1e5a2b9d40
+Create Date: 2026-10-17 13:40:22.871305
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'b4d2f8e61a37'
+down_revision = '7c1e5a2b9d40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'translation_jobs',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('chat_id', sa.BigInteger(), nullable=False),
+        sa.Column('message_id', sa.BigInteger(), nullable=True),
+        sa.Column('text', sa.Text(), nullable=False),
+        sa.Column('save_to_db', sa.Boolean(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_translation_jobs_status', 'translation_jobs', ['status'])
+
+
+def downgrade():
+    op.drop_index('ix_translation_jobs_status', table_name='translation_jobs')
+    op.drop_table('translation_jobs')
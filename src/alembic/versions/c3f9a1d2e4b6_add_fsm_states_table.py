@@ -0,0 +1,34 @@
+"""Add fsm_states table
+
+Revision ID: c3f9a1d2e4b6
+Revises: e91a3c5f7b28
+Create Date: 2026-10-17 23:05:41.204918
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'c3f9a1d2e4b6'
+down_revision = 'e91a3c5f7b28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'fsm_states',
+        sa.Column('key', sa.String(length=255), nullable=False),
+        sa.Column('state', sa.String(length=255), nullable=True),
+        sa.Column('data', sa.JSON(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('key'),
+    )
+    op.create_index('ix_fsm_states_updated_at', 'fsm_states', ['updated_at'])
+
+
+def downgrade():
+    op.drop_index('ix_fsm_states_updated_at', table_name='fsm_states')
+    op.drop_table('fsm_states')
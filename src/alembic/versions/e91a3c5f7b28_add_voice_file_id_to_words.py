@@ -0,0 +1,25 @@
+"""Add voice_file_id to words
+
+Revision ID: e91a3c5f7b28
+Revises: b4d2f8e61a37
+Create Date: 2026-10-17 15:02:47.316842
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'e91a3c5f7b28'
+down_revision = 'b4d2f8e61a37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('words', sa.Column('voice_file_id', sa.String(length=255), nullable=True))
+
+
+def downgrade():
+    op.drop_column('words', 'voice_file_id')
@@ -0,0 +1,167 @@
+"""
+Бенчмарк профилей движка БД: пропускная способность при одновременных чтениях и записях.
+
+Читатели выбирают слова на повторение и ищут слова (как планировщик и обработчики), писатели
+сохраняют новые слова и обновляют `voice_file_id`. Для каждого профиля создаётся своя база,
+поэтому результаты не влияют друг на друга. С `--processes N` нагрузка запускается в N процессах,
+как у воркеров супервизора: именно там блокировка файла в режиме rollback journal заметна сильнее всего.
+
+По умолчанию сравниваются `plain` и `sqlite` на временной SQLite-базе; для PostgreSQL передайте
+`--url postgresql+asyncpg://... --profiles plain postgresql` (таблицы создаются и удаляются бенчмарком,
+используйте отдельную базу).
+
+Запуск: `python src/benchmarks/bench_engine.py [--readers 8] [--writers 4] [--duration 10] [--processes 1]`
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('GEMINI_KEY', 'benchmark')
+
+from sqlalchemy import insert  # noqa: E402
+
+from core.data_types import WordData  # noqa: E402
+from database.database import ENGINE_PROFILES, Database  # noqa: E402
+from database.managers import WordManager, WordProgressManager  # noqa: E402
+from database.models import Base, Word, WordProgress  # noqa: E402
+
+
+@dataclass
+class Counters:
+    reads: int = 0
+    writes: int = 0
+    errors: int = 0
+    latencies: list[float] = field(default_factory=list)
+
+
+async def prepare(database: Database, words: int) -> None:
+    async with database.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(Word), [{'id': i, 'word': f'word{i}'} for i in range(1, words + 1)])
+        await conn.execute(
+            insert(WordProgress), [{'id': i, 'word_id': i, 'repetitions': 0} for i in range(1, words + 1)]
+        )
+
+
+async def reader(database: Database, words: int, deadline: float, counters: Counters) -> None:
+    while time.monotonic() < deadline:
+        started_at = time.monotonic()
+        try:
+            async with database.async_session() as session:
+                if random.random() < 0.5:
+                    await WordProgressManager(session).get_next_review_words(limit=10)
+                else:
+                    await WordManager(session).get_by_word(f'WORD{random.randint(1, words)}')
+        except Exception:
+            counters.errors += 1
+            continue
+        counters.reads += 1
+        counters.latencies.append(time.monotonic() - started_at)
+
+
+async def writer(database: Database, index: int, words: int, deadline: float, counters: Counters) -> None:
+    sequence = 0
+    while time.monotonic() < deadline:
+        started_at = time.monotonic()
+        try:
+            async with database.async_session() as session:
+                if sequence % 2:
+                    await WordManager(session).set_voice_file_id(random.randint(1, words), f'file-{sequence}')
+                else:
+                    word = f'new-{index}-{sequence}'
+                    await WordManager(session).bulk_create_from_data(
+                        [WordData(word, None, None, None, None, None, examples=[])]
+                    )
+        except Exception:
+            counters.errors += 1
+            continue
+        finally:
+            sequence += 1
+        counters.writes += 1
+        counters.latencies.append(time.monotonic() - started_at)
+
+
+async def workload(url: str, profile: str, process: int, args: argparse.Namespace) -> Counters:
+    database = Database(url, ENGINE_PROFILES[profile])
+    counters = Counters()
+    deadline = time.monotonic() + args.duration
+    await asyncio.gather(
+        *(reader(database, args.words, deadline, counters) for _ in range(args.readers)),
+        *(
+            writer(database, process * args.writers + index, args.words, deadline, counters)
+            for index in range(args.writers)
+        ),
+    )
+    await database.dispose()
+    return counters
+
+
+def run_workload(url: str, profile: str, process: int, args: argparse.Namespace) -> Counters:
+    return asyncio.run(workload(url, profile, process, args))
+
+
+async def run_profile(url: str, profile: str, args: argparse.Namespace) -> None:
+    database = Database(url, ENGINE_PROFILES[profile])
+    await prepare(database, args.words)
+    await database.dispose()
+    if args.processes == 1:
+        results = [await workload(url, profile, 0, args)]
+    else:
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(max_workers=args.processes) as executor:
+            results = await asyncio.gather(
+                *(
+                    loop.run_in_executor(executor, run_workload, url, profile, process, args)
+                    for process in range(args.processes)
+                )
+            )
+    counters = Counters()
+    for result in results:
+        counters.reads += result.reads
+        counters.writes += result.writes
+        counters.errors += result.errors
+        counters.latencies.extend(result.latencies)
+    latencies = sorted(counters.latencies) or [0.0]
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    reads, writes = counters.reads / args.duration, counters.writes / args.duration
+    print(
+        f'{profile:<12} reads {reads:8.1f}/s   writes {writes:7.1f}/s   '
+        f'errors {counters.errors:5}   p95 {p95 * 1000:7.1f} ms'
+    )
+
+
+async def run(args: argparse.Namespace) -> None:
+    print(
+        f'{args.processes} processes x ({args.readers} readers, {args.writers} writers), '
+        f'{args.duration} s, {args.words} words'
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        for profile in args.profiles:
+            url = args.url or f'sqlite+aiosqlite:///{directory}/{profile}.db'
+            await run_profile(url, profile, args)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='database URL (default: temporary SQLite file per profile)')
+    parser.add_argument('--profiles', nargs='+', default=['plain', 'sqlite'], choices=sorted(ENGINE_PROFILES))
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per profile')
+    parser.add_argument('--words', type=int, default=10_000)
+    parser.add_argument('--processes', type=int, default=1, help='run the workload in several processes')
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
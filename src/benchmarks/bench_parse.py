@@ -0,0 +1,64 @@
+"""
+Микробенчмарк разбора ответа Gemini: текущий путь (`extract_words` + `parse_json` + `WordData(**word)`)
+против структурированного ответа (`core.schema.parse_words`).
+
+Запуск: `python src/benchmarks/bench_parse.py [количество слов] [повторы]`
+"""
+
+import json
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.data_types import ExampleData, WordData  # noqa: E402
+from core.schema import json_loads, parse_words  # noqa: E402
+
+
+def make_word(index: int) -> dict:
+    return {
+        'word': f'word {index}',
+        'transcription': f'/wɜːd {index}/',
+        'translation': f'слово {index}',
+        'explanation': 'объяснение на русском языке ' * 5,
+        'part_of_speech': 'noun',
+        'forms': '1. word 2. words',
+        'examples': [{'example': f'Example {i} for word {index}.', 'translation': f'Пример {i}.'} for i in range(3)],
+    }
+
+
+def legacy_parse(text: str) -> list[WordData]:
+    json_string = text.replace('```', '')
+    if json_string.startswith('json'):
+        json_string = json_string[4:].strip()
+    words = json.loads(json_string)['words']
+    result = []
+    for word in words:
+        examples = word.pop('examples', [])
+        result.append(WordData(examples=[ExampleData(**example) for example in examples], **word))
+    return result
+
+
+def structured_parse(text: str) -> list[WordData]:
+    words, _ = parse_words(text)
+    return words
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    payload = json.dumps({'words': [make_word(i) for i in range(count)]}, ensure_ascii=False)
+    wrapped = f'```json\n{payload}\n```'
+    assert legacy_parse(wrapped) == structured_parse(payload)
+    print(f'JSON decoder: {json_loads.__module__}, words per answer: {count}, repeats: {repeats}')
+    for name, func, text in (
+        ('legacy (prose-wrapped JSON)', legacy_parse, wrapped),
+        ('structured (schema-validated)', structured_parse, payload),
+    ):
+        seconds = min(timeit.repeat(lambda: func(text), number=repeats, repeat=3))
+        print(f'{name:32} {seconds / repeats * 1e6:8.2f} µs per answer')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+"""
+Бенчмарк горячих запросов `database.managers` на синтетическом словаре: планы выполнения (EXPLAIN)
+и время каждого метода менеджера. Полные проходы по большим таблицам помечаются как `FULL SCAN`.
+
+По умолчанию создаёт временную SQLite-базу; PostgreSQL — через `--url postgresql+asyncpg://...`
+(таблицы создаются и удаляются бенчмарком, поэтому используйте отдельную базу).
+С `--no-indexes` индексы из миграции 5a8e2c7d1f93 удаляются, чтобы сравнить планы до и после.
+
+Запуск: `python src/benchmarks/bench_queries.py [--words 100000] [--repeat 50] [--output plans.json]`
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('GEMINI_KEY', 'benchmark')
+
+from sqlalchemy import event, insert, text  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine  # noqa: E402
+
+from constants import UTC  # noqa: E402
+from core.data_types import WordData  # noqa: E402
+from database.managers import WordManager, WordProgressManager  # noqa: E402
+from database.models import Base, Example, Word, WordProgress  # noqa: E402
+
+CHUNK_SIZE = 10_000
+NEW_INDEXES = (
+    'ix_words_word_lower',
+    'ix_word_progress_next_review_at',
+    'ix_word_progress_word_id',
+    'ix_examples_word_id',
+)
+LARGE_TABLES = ('words', 'word_progress', 'examples')
+
+
+def word_text(index: int) -> str:
+    # Смешанный регистр, чтобы поиск без учёта регистра был честным.
+    return f'Word{index}' if index % 2 else f'word{index}'
+
+
+async def fill(engine: AsyncEngine, words: int) -> None:
+    now = datetime.now(tz=UTC)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    for start in range(1, words + 1, CHUNK_SIZE):
+        ids = range(start, min(start + CHUNK_SIZE, words + 1))
+        async with engine.begin() as conn:
+            await conn.execute(
+                insert(Word),
+                [{'id': i, 'word': word_text(i), 'translation': f'слово {i}', 'explanation': 'x' * 200} for i in ids],
+            )
+            await conn.execute(
+                insert(Example),
+                [
+                    {'word_id': i, 'example': f'Example {j} for {i}.', 'translation': f'Пример {j}.'}
+                    for i in ids
+                    for j in range(2)
+                ],
+            )
+            await conn.execute(
+                insert(WordProgress),
+                [
+                    {
+                        'id': i,
+                        'word_id': i,
+                        'repetitions': 0,
+                        'next_review_at': now + timedelta(days=random.randint(-30, 180)),
+                    }
+                    for i in ids
+                ],
+            )
+    async with engine.begin() as conn:
+        await conn.execute(text('ANALYZE'))
+
+
+async def drop_new_indexes(engine: AsyncEngine) -> None:
+    async with engine.begin() as conn:
+        for name in NEW_INDEXES:
+            await conn.execute(text(f'DROP INDEX IF EXISTS {name}'))
+
+
+class StatementRecorder:
+    """Запоминает SQL-запросы, выполненные при `enabled = True`, чтобы потом получить их планы."""
+
+    def __init__(self, engine: AsyncEngine) -> None:
+        self.statements: list[tuple[str, Any]] = []
+        self.enabled = False
+        event.listen(engine.sync_engine, 'before_cursor_execute', self.before_cursor_execute)
+
+    def before_cursor_execute(self, conn: Any, cursor: Any, statement: str, parameters: Any, *args: Any) -> None:
+        if self.enabled and not statement.lstrip().upper().startswith('EXPLAIN'):
+            self.statements.append((statement, parameters))
+
+
+async def explain(engine: AsyncEngine, statement: str, parameters: Any) -> list[str]:
+    prefix = 'EXPLAIN QUERY PLAN ' if engine.dialect.name == 'sqlite' else 'EXPLAIN '
+    async with engine.connect() as conn:
+        result = await conn.exec_driver_sql(prefix + statement, parameters)
+        rows = result.all()
+    if engine.dialect.name == 'sqlite':
+        return [row[-1] for row in rows]
+    return [row[0] for row in rows]
+
+
+def find_full_scans(plan: list[str]) -> list[str]:
+    scans = []
+    for line in plan:
+        for table in LARGE_TABLES:
+            # SQLite: "SCAN words" (в том числе "SCAN words USING COVERING INDEX ..." — полный проход по индексу),
+            # в отличие от поиска "SEARCH words USING INDEX ..."; PostgreSQL: "Seq Scan on words".
+            if line.strip().startswith(f'SCAN {table}') or f'Seq Scan on {table}' in line:
+                scans.append(line.strip())
+    return scans
+
+
+async def measure(
+    engine: AsyncEngine,
+    session_factory: async_sessionmaker[AsyncSession],
+    recorder: StatementRecorder,
+    name: str,
+    method: Callable[[AsyncSession], Awaitable[Any]],
+    repeat: int,
+) -> dict[str, Any]:
+    async with session_factory() as session:
+        recorder.statements = []
+        recorder.enabled = True
+        await method(session)
+        recorder.enabled = False
+    statements = list(recorder.statements)
+    timings = []
+    for _ in range(repeat):
+        async with session_factory() as session:
+            started_at = time.perf_counter()
+            await method(session)
+            timings.append(time.perf_counter() - started_at)
+    timings.sort()
+    plans = [await explain(engine, statement, parameters) for statement, parameters in statements]
+    return {
+        'method': name,
+        'mean_ms': sum(timings) / len(timings) * 1000,
+        'p95_ms': timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000,
+        'queries': [
+            {'sql': ' '.join(statement.split()), 'plan': plan, 'full_scans': find_full_scans(plan)}
+            for (statement, _), plan in zip(statements, plans)
+        ],
+    }
+
+
+def make_word_data(word: str) -> WordData:
+    return WordData(
+        word=word,
+        transcription=None,
+        translation=None,
+        part_of_speech=None,
+        forms=None,
+        explanation=None,
+        examples=[],
+    )
+
+
+def manager_methods(words: int) -> dict[str, Callable[[AsyncSession], Awaitable[Any]]]:
+    def random_id() -> int:
+        return random.randint(1, words)
+
+    return {
+        'WordManager.get_by_word': lambda session: WordManager(session).get_by_word(word_text(random_id()).upper()),
+        'WordManager.get_with_examples': lambda session: WordManager(session).get_with_examples(random_id()),
+        'WordManager.bulk_create_from_data (existing words)': lambda session: WordManager(
+            session
+        ).bulk_create_from_data([make_word_data(word_text(random_id())) for _ in range(5)]),
+        'WordProgressManager.get_next_review_words': lambda session: WordProgressManager(session).get_next_review_words(
+            limit=10
+        ),
+        'WordProgressManager.get_with_word': lambda session: WordProgressManager(session).get_with_word(random_id()),
+    }
+
+
+async def run(url: str, words: int, repeat: int, drop_indexes: bool, output: Path | None) -> None:
+    engine = create_async_engine(url)
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+    started_at = time.perf_counter()
+    await fill(engine, words)
+    print(f'Filled {words} words in {time.perf_counter() - started_at:.1f} s ({engine.dialect.name})')
+    if drop_indexes:
+        await drop_new_indexes(engine)
+        print('Lookup indexes dropped')
+    recorder = StatementRecorder(engine)
+    results = []
+    for name, method in manager_methods(words).items():
+        result = await measure(engine, session_factory, recorder, name, method, repeat)
+        results.append(result)
+        print(f'\n{name}: mean {result["mean_ms"]:.2f} ms, p95 {result["p95_ms"]:.2f} ms')
+        for query in result['queries']:
+            print(f'  {query["sql"][:110]}')
+            for line in query['plan']:
+                print(f'    {line}')
+            for scan in query['full_scans']:
+                print(f'    !!! FULL SCAN: {scan}')
+    await engine.dispose()
+    if output:
+        report = {'dialect': engine.dialect.name, 'words': words, 'indexes': not drop_indexes, 'results': results}
+        output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f'\nReport written to {output}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='database URL (default: temporary SQLite file)')
+    parser.add_argument('--words', type=int, default=100_000, help='number of synthetic words (100k-1M)')
+    parser.add_argument('--repeat', type=int, default=50, help='calls per method for timings')
+    parser.add_argument('--no-indexes', action='store_true', help='drop the lookup indexes before measuring')
+    parser.add_argument('--output', type=Path, help='write plans and timings as JSON')
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        url = args.url or f'sqlite+aiosqlite:///{directory}/bench.db'
+        asyncio.run(run(url, args.words, args.repeat, args.no_indexes, args.output))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+import asyncio
+import json
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from constants import BATCH_TRANSLATE_PROMPT, NOT_PROCESSED
+from core.loggers import main_logger as logger
+
+
+class BatchFallback(Exception):
+    """Сообщение нужно отправить отдельным запросом (батч не собрался или его ответ не разобран)."""
+
+
+@dataclass
+class BatchItem:
+    message: str
+    future: asyncio.Future
+
+
+@dataclass
+class BatchStats:
+    batches: int = 0
+    batched_messages: int = 0
+    fallbacks: int = 0
+
+
+def message_key(index: int) -> str:
+    return f'm{index}'
+
+
+def build_batch_prompt(template: str, messages: list[str]) -> str:
+    instruction = template.format(message='(каждое из сообщений ниже)')
+    # JSON экранирует переводы строк и кавычки: текст сообщения не может подделать запись другого чата.
+    keys = [message_key(index) for index in range(len(messages))]
+    lines = '\n'.join(json.dumps({key: message}, ensure_ascii=False) for key, message in zip(keys, messages))
+    return BATCH_TRANSLATE_PROMPT.format(
+        count=len(messages), keys=', '.join(keys), instruction=instruction, messages=lines
+    )
+
+
+def parse_batch_answer(text: str) -> dict[str, Any]:
+    json_string = text.strip().replace('```', '')
+    if json_string.startswith('json'):
+        json_string = json_string[4:].strip()
+    results = json.loads(json_string)
+    if not isinstance(results, dict):
+        raise ValueError(f'Expected a JSON object for batch answer, got: {type(results)}')
+    return results
+
+
+class GeminiBatcher:
+    """
+    Собирает сообщения, пришедшие за короткое окно, в один запрос к Gemini.
+
+    Батч отправляется по истечении `window` секунд после первого сообщения или при достижении `max_size`.
+    Ответ разбирается по ключам сообщений. Если в окне оказалось одно сообщение или ответ не удалось
+    разобрать, ожидающие получают `BatchFallback` и выполняют обычный одиночный запрос.
+    """
+
+    def __init__(self, request: Callable[[str], Awaitable[str]], window: float, max_size: int) -> None:
+        self.request = request
+        self.window = window
+        self.max_size = max_size
+        self.pending: dict[str, list[BatchItem]] = {}
+        self.timers: dict[str, asyncio.TimerHandle] = {}
+        self.tasks: set[asyncio.Task] = set()
+        self.stats = BatchStats()
+
+    async def submit(self, message: str, template: str) -> dict | str:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        items = self.pending.setdefault(template, [])
+        items.append(BatchItem(message=message, future=future))
+        if len(items) >= self.max_size:
+            self.flush(template)
+        elif len(items) == 1:
+            self.timers[template] = loop.call_later(self.window, self.flush, template)
+        return await future
+
+    def flush(self, template: str) -> None:
+        timer = self.timers.pop(template, None)
+        if timer:
+            timer.cancel()
+        items = self.pending.pop(template, [])
+        if not items:
+            return
+        if len(items) == 1:
+            self._fail(items, 'single message in batch window')
+            return
+        task = asyncio.create_task(self._run(template, items))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    def _fail(self, items: list[BatchItem], reason: str) -> None:
+        for item in items:
+            if not item.future.done():
+                item.future.set_exception(BatchFallback(reason))
+
+    async def _run(self, template: str, items: list[BatchItem]) -> None:
+        self.stats.batches += 1
+        self.stats.batched_messages += len(items)
+        logger.info('Sending batch of %s messages to Gemini API', len(items))
+        try:
+            text = await self.request(build_batch_prompt(template, [item.message for item in items]))
+            results = parse_batch_answer(text)
+        except Exception as e:
+            logger.error('Batch request to Gemini API failed, falling back to single requests: %s', e)
+            self.stats.fallbacks += len(items)
+            self._fail(items, str(e))
+            return
+        for index, item in enumerate(items):
+            result = results.get(message_key(index))
+            if item.future.done():
+                continue
+            if isinstance(result, dict) or result == NOT_PROCESSED:
+                item.future.set_result(result)
+            else:
+                self.stats.fallbacks += 1
+                item.future.set_exception(BatchFallback(f'no result for message {message_key(index)}'))
+
+    def describe(self) -> str:
+        return (
+            f'Batches: {self.stats.batches}, batched messages: {self.stats.batched_messages}, '
+            f'fallbacks: {self.stats.fallbacks}'
+        )
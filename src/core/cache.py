@@ -0,0 +1,142 @@
+import copy
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Generic, Hashable, TypeVar
+
+from constants import (
+    TRANSLATION_CACHE_DB_TTL,
+    TRANSLATION_CACHE_ENABLED,
+    TRANSLATION_CACHE_SIZE,
+    TRANSLATION_CACHE_TTL,
+)
+from core.loggers import main_logger as logger
+from database.database import db
+from database.managers import CachedTranslationManager
+from utils import normalize_text
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+
+class TTLCache(Generic[K, V]):
+    """LRU-кэш в памяти процесса с ограничением размера и временем жизни записей."""
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def get(self, key: K) -> V | None:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: K) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    memory_hits: int = 0
+    db_hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.memory_hits + self.db_hits + self.misses
+        return (self.memory_hits + self.db_hits) / total if total else 0.0
+
+
+class TranslationCache:
+    """
+    Двухуровневый кэш разобранных ответов Gemini (`words`).
+
+    Ключ — нормализованное сообщение и хэш текста промпта, поэтому после изменения промпта
+    старые записи перестают находиться. Первый уровень — LRU в памяти, второй — таблица `translation_cache`.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, db_ttl: float, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self.memory: TTLCache[str, list[dict]] = TTLCache(maxsize, ttl)
+        self.db_ttl = timedelta(seconds=db_ttl)
+        self.stats = CacheStats()
+
+    @staticmethod
+    def make_key(message: str, prompt_text: str) -> str:
+        return hash_text(f'{hash_text(prompt_text)}:{normalize_text(message)}')
+
+    async def get(self, message: str, prompt_text: str) -> list[dict] | None:
+        if not self.enabled:
+            return None
+        key = self.make_key(message, prompt_text)
+        words = self.memory.get(key)
+        if words is not None:
+            self.stats.memory_hits += 1
+            return copy.deepcopy(words)
+        try:
+            async with db.async_session() as session:
+                cached = await CachedTranslationManager(session).get_by_key(key, ttl=self.db_ttl)
+        except Exception as e:
+            logger.error('Error reading translation cache: %s', e)
+            cached = None
+        if cached is None:
+            self.stats.misses += 1
+            return None
+        self.stats.db_hits += 1
+        self.memory.set(key, cached.words)
+        return copy.deepcopy(cached.words)
+
+    async def set(self, message: str, prompt_text: str, words: list[dict]) -> None:
+        if not self.enabled:
+            return
+        key = self.make_key(message, prompt_text)
+        words = copy.deepcopy(words)
+        self.memory.set(key, words)
+        try:
+            async with db.async_session() as session:
+                await CachedTranslationManager(session).set(key, hash_text(prompt_text), message, words)
+        except Exception as e:
+            logger.error('Error writing translation cache: %s', e)
+
+    def invalidate(self) -> None:
+        self.memory.clear()
+
+    def describe(self) -> str:
+        return (
+            f'Translation cache: {len(self.memory)} in memory, '
+            f'memory hits {self.stats.memory_hits}, db hits {self.stats.db_hits}, '
+            f'misses {self.stats.misses}, hit rate {self.stats.hit_rate:.0%}'
+        )
+
+
+translation_cache = TranslationCache(
+    maxsize=TRANSLATION_CACHE_SIZE,
+    ttl=TRANSLATION_CACHE_TTL,
+    db_ttl=TRANSLATION_CACHE_DB_TTL,
+    enabled=TRANSLATION_CACHE_ENABLED,
+)
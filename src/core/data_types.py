@@ -1,13 +1,13 @@
 from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(slots=True)
 class ExampleData:
     example: str | None
     translation: str | None
 
 
-@dataclass
+@dataclass(slots=True)
 class WordData:
     word: str | None
     transcription: str | None
@@ -0,0 +1,129 @@
+import asyncio
+import re
+import string
+
+from sqlalchemy import select
+
+from constants import DICTIONARY_MAX_TOKENS
+from core.loggers import main_logger as logger
+from database.database import db
+from database.managers import WordManager
+from database.models import Word
+from utils import has_russian
+
+PUNCTUATION = string.punctuation + '«»“”‘’…—–'
+FORM_TOKEN = re.compile(r"[a-z]+(?:['-][a-z]+)*")
+# (суффикс, замена) для простых словоформ: "takes" -> "take", "studied" -> "study", "making" -> "make".
+# Вариант принимается, только если исходная форма есть в `forms` найденного слова: иначе "news" стало бы "new".
+INFLECTION_RULES = [
+    ('ies', 'y'),
+    ('es', ''),
+    ('s', ''),
+    ('ied', 'y'),
+    ('ed', ''),
+    ('ed', 'e'),
+    ('ing', ''),
+    ('ing', 'e'),
+]
+
+
+def normalize_headword(text: str) -> str:
+    tokens = (token.strip(PUNCTUATION) for token in text.lower().split())
+    return ' '.join(token for token in tokens if token)
+
+
+def parse_forms(forms: str | None) -> frozenset[str]:
+    """Английские слова из поля `forms` ("1. take 2. took 3. taken" -> {"take", "took", "taken"})."""
+    return frozenset(FORM_TOKEN.findall(forms.lower())) if forms else frozenset()
+
+
+def inflection_variants(headword: str) -> dict[str, str]:
+    """Варианты фразы, где одно из слов приведено к базовой форме: вариант -> исходное слово."""
+    variants: dict[str, str] = {}
+    tokens = headword.split()
+    for index, token in enumerate(tokens):
+        for suffix, replacement in INFLECTION_RULES:
+            if token.endswith(suffix) and len(token) - len(suffix) >= 2:
+                base = token[: -len(suffix)] + replacement
+                # Удвоенная согласная: "stopped" -> "stop", "getting" -> "get".
+                bases = [base]
+                if not replacement and len(base) > 2 and base[-1] == base[-2]:
+                    bases.append(base[:-1])
+                for base in bases:
+                    variant = ' '.join([*tokens[:index], base, *tokens[index + 1 :]])
+                    if variant != headword:
+                        variants.setdefault(variant, token)
+    return variants
+
+
+class HeadwordIndex:
+    """
+    Индекс слов, уже сохранённых в таблице `words`: нормализованное слово -> id и формы каждого слова.
+
+    Загружается из БД один раз и пополняется при создании слов через `WordManager.create_from_data`.
+    """
+
+    def __init__(self, max_tokens: int) -> None:
+        self.max_tokens = max_tokens
+        self.words: dict[str, int] = {}
+        self.forms: dict[int, frozenset[str]] = {}
+        self.loaded = False
+        self.hits = 0
+        self._lock = asyncio.Lock()
+
+    async def load(self) -> None:
+        async with self._lock:
+            if self.loaded:
+                return
+            async with db.async_session() as session:
+                result = await session.execute(select(Word.id, Word.word, Word.forms))
+                for word_id, word, forms in result.all():
+                    if word:
+                        self.words[normalize_headword(word)] = word_id
+                        self.forms[word_id] = parse_forms(forms)
+            self.loaded = True
+            logger.info('Headword index loaded: %s words', len(self.words))
+
+    def add(self, word: Word) -> None:
+        if word.word:
+            self.words[normalize_headword(word.word)] = word.id
+            self.forms[word.id] = parse_forms(word.forms)
+
+    def discard(self, word_id: int) -> None:
+        for headword in [headword for headword, indexed_id in self.words.items() if indexed_id == word_id]:
+            del self.words[headword]
+        self.forms.pop(word_id, None)
+
+    def find(self, text: str) -> int | None:
+        if '\n' in text or has_russian(text):
+            return None
+        headword = normalize_headword(text)
+        if not headword or len(headword.split()) > self.max_tokens:
+            return None
+        if headword in self.words:
+            return self.words[headword]
+        for variant, token in inflection_variants(headword).items():
+            word_id = self.words.get(variant)
+            if word_id is not None and token in self.forms.get(word_id, ()):
+                return word_id
+        return None
+
+    async def lookup(self, text: str) -> list[str] | None:
+        """Готовый ответ из локального словаря или `None`, если слово нужно запрашивать у Gemini."""
+        if not self.loaded:
+            await self.load()
+        word_id = self.find(text)
+        if word_id is None:
+            return None
+        async with db.async_session() as session:
+            word = await WordManager(session).get_snapshot(word_id)
+        if word is None:
+            self.discard(word_id)
+            return None
+        self.hits += 1
+        logger.info('Answered from local dictionary: %s -> %s', text, word.data.word)
+        return [word.message]
+
+
+headword_index = HeadwordIndex(max_tokens=DICTIONARY_MAX_TOKENS)
+WordManager.created_hooks.append(headword_index.add)
@@ -1,45 +1,228 @@
+import asyncio
 import json
-import random
-from dataclasses import dataclass
+import time
+from dataclasses import asdict, dataclass
+from typing import AsyncIterator
 
-from httpx import AsyncClient, RequestError
+from httpx import HTTPStatusError, RequestError
 
 from constants import (
+    BATCH_MAX_SIZE,
+    BATCH_WINDOW,
     DEFAULT_TRANSLATE_PROMPT,
-    GEMINI_KEY,
-    GEMINI_MODELS,
+    DICTIONARY_FAST_PATH,
+    GEMINI_BATCHING,
+    GEMINI_HEDGING,
+    GEMINI_RETRY_FAILOVER,
+    GEMINI_STRUCTURED_OUTPUT,
+    HEDGE_MAX_DELAY,
+    HEDGE_MIN_DELAY,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_PERCENTILE,
     NOT_PROCESSED,
-    PROXY,
+    WRITE_BEHIND_ENABLED,
     NotProccesed,
     PromptName,
 )
-from core.data_types import ExampleData, WordData
-from core.decorators import retry_request
+from core.batching import BatchFallback, GeminiBatcher
+from core.cache import translation_cache
+from core.data_types import WordData
+from core.dictionary import headword_index
+from core.gemini_client import gemini_client
+from core.json_stream import WordsStreamParser
 from core.loggers import main_logger as logger
+from core.retry import deadline_expired, gemini_retry_policy, get_retry_after
+from core.router import model_router
+from core.schema import STRUCTURED_GENERATION_CONFIG, WordValidationError, parse_words, validate_word
+from core.single_flight import SingleFlight
+from core.write_behind import word_writer
 from database.database import db
 from database.managers import PromptManager, WordManager
 from utils import has_russian
 
 
-@retry_request()
-async def request_gemini(prompt: str) -> dict | NotProccesed:
-    headers = {'Content-Type': 'application/json'}
-    params = {'key': GEMINI_KEY}
-    data = {'contents': [{'parts': [{'text': prompt}]}]}
-    async with AsyncClient(timeout=30.0, proxy=PROXY) as client:
-        model = random.choice(GEMINI_MODELS)
-        logger.info(f'Request to Gemini API successful with model: {model}')
-        base_url = f'https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent'
-        response = await client.post(base_url, headers=headers, json=data, params=params)
+async def request_model(model: str, data: dict) -> dict:
+    logger.info(f'Request to Gemini API successful with model: {model}')
+    started_at = time.monotonic()
+    try:
+        response = await gemini_client.generate_content(model, data)
         logger.info('Response status code: %s\nText: %s', response.status_code, response.text)
         response.raise_for_status()
-        return response.json()
+    except HTTPStatusError as e:
+        model_router.record_failure(
+            model,
+            time.monotonic() - started_at,
+            status_code=e.response.status_code,
+            retry_after=get_retry_after(e.response),
+        )
+        raise
+    except RequestError:
+        model_router.record_failure(model, time.monotonic() - started_at)
+        raise
+    except asyncio.CancelledError:
+        # Попытку прервал бюджет политики повторов: модель зависла, это ошибка, а не просто отмена.
+        if deadline_expired():
+            model_router.record_failure(model, time.monotonic() - started_at)
+        else:
+            model_router.release(model)
+        raise
+    model_router.record_success(model, time.monotonic() - started_at)
+    return response.json()
+
+
+@dataclass
+class HedgeStats:
+    fired: int = 0
+    won: int = 0
+    skipped: int = 0
+
+
+hedge_stats = HedgeStats()
+gemini_flight: SingleFlight[tuple[str, bool], dict | list] = SingleFlight()
+
+
+def get_hedge_deadline(model: str) -> float:
+    """Через сколько секунд без ответа отправлять запасной запрос (перцентиль наблюдаемой задержки)."""
+    observed = model_router.latency_percentile(HEDGE_PERCENTILE, model, min_samples=HEDGE_MIN_SAMPLES)
+    if observed is None:
+        return HEDGE_MAX_DELAY
+    return min(max(observed, HEDGE_MIN_DELAY), HEDGE_MAX_DELAY)
+
+
+async def request_hedged(data: dict, exclude: list[str] | None = None, used_models: list[str] | None = None) -> dict:
+    """Запрос с запасным запросом в другую модель; модели, в которые ушли запросы, добавляются в `used_models`."""
+    if used_models is None:
+        used_models = []
+    primary = model_router.choose(exclude=exclude or ())
+    used_models.append(primary)
+    deadline = get_hedge_deadline(primary)
+    first = asyncio.create_task(request_model(primary, data))
+    pending = {first}
+    # Незавершённые запросы отменяются при любом выходе, в том числе при отмене вызывающего кода.
+    try:
+        done, pending = await asyncio.wait(pending, timeout=deadline)
+        if done:
+            return first.result()
+        secondary = model_router.choose(exclude={primary, *(exclude or ())})
+        if secondary == primary:
+            hedge_stats.skipped += 1
+            return await first
+        hedge_stats.fired += 1
+        used_models.append(secondary)
+        logger.info('Model %s did not answer in %.2f s, hedging with %s', primary, deadline, secondary)
+        second = asyncio.create_task(request_model(secondary, data))
+        pending = {first, second}
+        last_error: BaseException | None = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                error = task.exception()
+                if error is None:
+                    if task is second:
+                        hedge_stats.won += 1
+                    return task.result()
+                last_error = error
+        raise last_error  # type: ignore[misc]
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def get_answer_text(answer: dict) -> str:
+    parts = answer.get('candidates', [{}])[0].get('content', {}).get('parts', [])
+    return ''.join(part.get('text', '') for part in parts)
+
+
+def build_request_data(prompt: str, structured: bool = False) -> dict:
+    data: dict = {'contents': [{'parts': [{'text': prompt}]}]}
+    if structured:
+        data['generationConfig'] = STRUCTURED_GENERATION_CONFIG
+    return data
+
+
+async def stream_gemini(prompt: str, structured: bool = False) -> AsyncIterator[str]:
+    """Отдаёт фрагменты текста ответа по мере генерации (`streamGenerateContent`, SSE)."""
+    data = build_request_data(prompt, structured)
+    model = model_router.choose()
+    logger.info('Streaming request to Gemini API with model: %s', model)
+    started_at = time.monotonic()
+    try:
+        async with gemini_client.stream_generate_content(model, data) as response:
+            if response.is_error:
+                await response.aread()
+                logger.info('Response status code: %s\nText: %s', response.status_code, response.text)
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith('data:'):
+                    continue
+                try:
+                    chunk = json.loads(line[5:])
+                except json.JSONDecodeError:
+                    logger.error('Invalid SSE chunk from Gemini API: %s', line)
+                    continue
+                if text := get_answer_text(chunk):
+                    yield text
+    except HTTPStatusError as e:
+        model_router.record_failure(
+            model,
+            time.monotonic() - started_at,
+            status_code=e.response.status_code,
+            retry_after=get_retry_after(e.response),
+        )
+        raise
+    except RequestError:
+        model_router.record_failure(model, time.monotonic() - started_at)
+        raise
+    except (asyncio.CancelledError, GeneratorExit):
+        model_router.release(model)
+        raise
+    model_router.record_success(model, time.monotonic() - started_at)
+
+
+async def request_gemini(prompt: str, hedge: bool = False, structured: bool = False) -> dict | NotProccesed:
+    data = build_request_data(prompt, structured)
+    last_models: list[str] = []
+
+    async def attempt() -> dict:
+        # При повторе не отправляем запрос в модели предыдущей попытки, которые только что ответили ошибкой.
+        exclude = list(last_models) if GEMINI_RETRY_FAILOVER else []
+        last_models.clear()
+        if hedge:
+            return await request_hedged(data, exclude=exclude, used_models=last_models)
+        model = model_router.choose(exclude=exclude)
+        last_models.append(model)
+        return await request_model(model, data)
+
+    return await gemini_retry_policy.run(attempt)
+
+
+async def request_gemini_text(prompt: str) -> str:
+    response = await request_gemini(prompt)
+    return get_answer_text(response) if isinstance(response, dict) else response
+
+
+gemini_batcher = GeminiBatcher(request_gemini_text, window=BATCH_WINDOW, max_size=BATCH_MAX_SIZE)
 
 
 @dataclass
 class GeminiEnglight:
     message: str
     save_to_db: bool = True
+    hedge: bool = GEMINI_HEDGING
+    use_dictionary: bool = DICTIONARY_FAST_PATH
+    batch: bool = GEMINI_BATCHING
+    structured: bool = GEMINI_STRUCTURED_OUTPUT
+    # Пробрасывать ошибки запроса вызывающему коду вместо ответа "Oops..." (нужно очереди задач).
+    raise_errors: bool = False
+
+    async def lookup_dictionary(self) -> list[str] | None:
+        if not self.use_dictionary:
+            return None
+        try:
+            return await headword_index.lookup(self.message)
+        except Exception as e:
+            logger.error('Error looking up local dictionary: %s', e)
+            return None
 
     async def get_prompt(self) -> str:
         async with db.async_session() as session:
@@ -68,67 +251,161 @@ class GeminiEnglight:
             logger.error('JSON decoding error: %s', json_string)
             return NOT_PROCESSED
 
-    async def create_word_object(self, word_data: WordData) -> None:
-        try:
+    async def create_word_objects(self, words_data: list[WordData]) -> None:
+        valid_words = []
+        for word_data in words_data:
             if not isinstance(word_data, WordData) or not word_data.word:
                 logger.error('Invalid WordData object: %s', word_data)
-                return
-            if has_russian(word_data.word):
+            elif has_russian(word_data.word):
                 logger.error('Word contains Russian characters: %s', word_data.word)
-                return
+            else:
+                valid_words.append(word_data)
+        if not valid_words:
+            return
+        if WRITE_BEHIND_ENABLED and word_writer.running:
+            await word_writer.put(valid_words)
+            return
+        try:
             async with db.async_session() as session:
-                manager = WordManager(session)
-                word = await manager.get_by_word(word_data.word)
-                if word:
-                    logger.info('Word object already exists for word: %s', word_data.word)
-                    return
-                await manager.create_from_data(word_data)
+                created = await WordManager(session).bulk_create_from_data(valid_words)
+            logger.info('Created %s of %s word objects', len(created), len(valid_words))
         except Exception as e:
-            logger.error('Error creating word object from WordData: %s\nError: %s', word_data, e)
+            logger.error('Error creating word objects from WordData: %s\nError: %s', valid_words, e)
 
     async def create_messages(self, words: list) -> list[str]:
         messages = []
+        words_data = []
         for word in words:
-            if not isinstance(word, dict):
-                msg = 'Expected a dictionary for word, got: %s, value %s' % (type(word), word)
-                logger.error(msg)
-                messages.append(msg)
             try:
-                examples = word.pop('examples', [])
-                example_objects = [ExampleData(**example) for example in examples]
-                word_data = WordData(examples=example_objects, **word)
-                if self.save_to_db:
-                    logger.info('Creating WordData object for word: %s', word_data.word)
-                    await self.create_word_object(word_data)
-            except TypeError as e:
+                words_data.append(validate_word(word))
+            except WordValidationError as e:
                 msg = 'Error creating WordData from word: %s\nError: %s' % (str(word), str(e))
                 logger.error(msg)
                 messages.append(msg)
-            messages.append(word_data.create_message())
-        return messages
+        return messages + await self.create_word_messages(words_data)
 
-    async def process_answer(self, answer: dict) -> dict | list:
+    async def create_word_messages(self, words_data: list[WordData]) -> list[str]:
+        if self.save_to_db:
+            await self.create_word_objects(words_data)
+        return [word_data.create_message() for word_data in words_data]
+
+    async def process_answer(self, answer: dict, template: str | None = None) -> dict | list:
         cleared_answer = self.extract_words(answer)
         if cleared_answer == NOT_PROCESSED:
             return ['Gemini API returned "not processed" response. Try again.']
         words = self.parse_json(cleared_answer)
+        return await self.process_words(words, template)
+
+    async def process_words(self, words: dict | NotProccesed, template: str | None = None) -> dict | list:
         if not isinstance(words, dict):
             return ['Gemini API returned an invalid response format. Try again.']
         words_list = words.get('words', [])
+        if words_list and template is not None:
+            await translation_cache.set(self.message, template, words_list)
         return await self.create_messages(words_list) if words_list else []
 
+    async def process_structured_answer(self, answer: dict, template: str | None = None) -> dict | list:
+        try:
+            words_data, errors = parse_words(get_answer_text(answer))
+        except ValueError as e:
+            logger.error('Invalid structured response from Gemini API: %s\nError: %s', answer, e)
+            return ['Gemini API returned an invalid response format. Try again.']
+        for error in errors:
+            logger.error(error)
+        if not words_data and not errors:
+            return ['Gemini API returned "not processed" response. Try again.']
+        if words_data and template is not None:
+            await translation_cache.set(self.message, template, [asdict(word_data) for word_data in words_data])
+        return errors + await self.create_word_messages(words_data)
+
+    async def stream(self) -> AsyncIterator[str]:
+        """
+        Потоковый вариант `__call__`: сообщение по каждому слову отдаётся, как только слово
+        полностью пришло от Gemini. Если поток оборвался до первого слова, повторяет запрос обычным способом.
+        """
+        produced = False
+        try:
+            logger.info('Streaming Gemini API with message: %s', self.message)
+            known = await self.lookup_dictionary()
+            if known is not None:
+                for message in known:
+                    produced = True
+                    yield message
+                return
+            template = await self.get_prompt()
+            cached_words = await translation_cache.get(self.message, template)
+            if cached_words is not None:
+                for message in await self.create_messages(cached_words):
+                    produced = True
+                    yield message
+                return
+            prompt = template.format(message=self.message)
+            parser = WordsStreamParser()
+            streamed_words: list[dict] = []
+            async for chunk in stream_gemini(prompt, structured=self.structured):
+                for word in parser.feed(chunk):
+                    streamed_words.append(word)
+                    for message in await self.create_messages([word]):
+                        produced = True
+                        yield message
+            if parser.finished and streamed_words:
+                await translation_cache.set(self.message, template, streamed_words)
+            if not produced:
+                if parser.text.strip() == NOT_PROCESSED:
+                    yield 'Gemini API returned "not processed" response. Try again.'
+                elif not parser.in_array:
+                    yield 'Gemini API returned an invalid response format. Try again.'
+        except (RequestError, HTTPStatusError) as e:
+            logger.error('Streaming request to Gemini API failed:\n%s', str(e))
+            if produced:
+                yield 'Oops, the answer was interrupted. Try again.'
+                return
+            for answer in await self():
+                yield str(answer)
+        except Exception as e:
+            logger.error('An unexpected error occurred:\n%s', str(e), exc_info=True)
+            yield 'Oops, something went wrong. Try again.'
+
+    async def translate(self, template: str) -> dict | list:
+        cached_words = await translation_cache.get(self.message, template)
+        if cached_words is not None:
+            logger.info('Translation cache hit for message: %s', self.message)
+            return await self.create_messages(cached_words)
+        if self.batch:
+            try:
+                answer = await gemini_batcher.submit(self.message, template)
+                if answer == NOT_PROCESSED:
+                    return ['Gemini API returned "not processed" response. Try again.']
+                return await self.process_words(answer, template)  # type: ignore[arg-type]
+            except BatchFallback as e:
+                logger.info('Sending message as a single request (%s): %s', e, self.message)
+        prompt = template.format(message=self.message)
+        response = await request_gemini(prompt, hedge=self.hedge, structured=self.structured)
+        logger.info('Received response from Gemini API: %s', response)
+        if not isinstance(response, dict):
+            return ['Gemini API returned "not processed" response. Try again.']
+        if self.structured:
+            return await self.process_structured_answer(response, template)
+        return await self.process_answer(response, template)
+
     async def __call__(self) -> dict | list[NotProccesed | str]:
         try:
             logger.info('Requesting Gemini API with message: %s', self.message)
+            known = await self.lookup_dictionary()
+            if known is not None:
+                return known
             template = await self.get_prompt()
-            prompt = template.format(message=self.message)
-            response = await request_gemini(prompt)
-            logger.info('Received response from Gemini API: %s', response)
-            answers = await self.process_answer(response)
-            return answers
-        except RequestError as e:
+            # Одинаковые одновременные запросы делят один вызов Gemini и один разбор ответа.
+            key = (translation_cache.make_key(self.message, template), self.save_to_db)
+            answers = await gemini_flight.do(key, lambda: self.translate(template))
+            return list(answers)
+        except (RequestError, HTTPStatusError) as e:
             logger.error('Request to Gemini API failed:\n%s', str(e))
+            if self.raise_errors:
+                raise
             return ['Oops, something went wrong with Gemini API request. Try again.']
         except Exception as e:
             logger.error('An unexpected error occurred:\n%s', str(e), exc_info=True)
+            if self.raise_errors:
+                raise
             return ['Oops, something went wrong. Try again.']
@@ -0,0 +1,109 @@
+from contextlib import AbstractAsyncContextManager
+from importlib.util import find_spec
+from typing import Any
+
+from httpx import AsyncClient, Limits, Proxy, Response, Timeout
+
+from constants import (
+    GEMINI_API_URL,
+    GEMINI_CONNECT_TIMEOUT,
+    GEMINI_HTTP2,
+    GEMINI_KEEPALIVE_EXPIRY,
+    GEMINI_KEY,
+    GEMINI_MAX_CONNECTIONS,
+    GEMINI_MAX_KEEPALIVE_CONNECTIONS,
+    GEMINI_TIMEOUT,
+    PROXY,
+)
+from core.loggers import main_logger as logger
+
+
+class GeminiClient:
+    """
+    Долгоживущий HTTP-клиент для Gemini API.
+
+    Держит пул keep-alive соединений, чтобы не выполнять TCP/TLS handshake (и CONNECT через прокси)
+    на каждый запрос. Открывается в `main()` и закрывается при остановке приложения.
+    """
+
+    def __init__(
+        self,
+        api_url: str,
+        api_key: str | None,
+        timeout: float,
+        connect_timeout: float,
+        max_connections: int,
+        max_keepalive_connections: int,
+        keepalive_expiry: float,
+        http2: bool = False,
+        proxy: Proxy | None = None,
+    ) -> None:
+        self.api_url = api_url.rstrip('/')
+        self.api_key = api_key
+        self.timeout = Timeout(timeout, connect=connect_timeout)
+        self.limits = Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2
+        self.proxy = proxy
+        self._client: AsyncClient | None = None
+
+    @property
+    def client(self) -> AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self.open()
+        return self._client  # type: ignore[return-value]
+
+    def open(self) -> None:
+        if self._client is not None and not self._client.is_closed:
+            return
+        http2 = self.http2
+        if http2 and find_spec('h2') is None:
+            logger.warning('HTTP/2 for Gemini client requested, but "h2" package is not installed. Using HTTP/1.1.')
+            http2 = False
+        self._client = AsyncClient(
+            headers={'Content-Type': 'application/json'},
+            params={'key': self.api_key} if self.api_key else None,
+            timeout=self.timeout,
+            limits=self.limits,
+            http2=http2,
+            proxy=self.proxy,
+        )
+        logger.info('Gemini client opened (http2=%s, limits=%s)', http2, self.limits)
+
+    async def close(self) -> None:
+        if self._client is None:
+            return
+        await self._client.aclose()
+        self._client = None
+        logger.info('Gemini client closed')
+
+    def model_url(self, model: str, method: str = 'generateContent') -> str:
+        return f'{self.api_url}/{model}:{method}'
+
+    async def generate_content(self, model: str, data: dict[str, Any]) -> Response:
+        return await self.client.post(self.model_url(model), json=data)
+
+    def stream_generate_content(self, model: str, data: dict[str, Any]) -> AbstractAsyncContextManager[Response]:
+        """Потоковый запрос: ответ приходит Server-Sent Events, по событию на каждый фрагмент текста."""
+        return self.client.stream(
+            'POST',
+            self.model_url(model, 'streamGenerateContent'),
+            json=data,
+            params={'alt': 'sse'},
+        )
+
+
+gemini_client = GeminiClient(
+    api_url=GEMINI_API_URL,
+    api_key=GEMINI_KEY,
+    timeout=GEMINI_TIMEOUT,
+    connect_timeout=GEMINI_CONNECT_TIMEOUT,
+    max_connections=GEMINI_MAX_CONNECTIONS,
+    max_keepalive_connections=GEMINI_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry=GEMINI_KEEPALIVE_EXPIRY,
+    http2=GEMINI_HTTP2,
+    proxy=PROXY,
+)
@@ -0,0 +1,142 @@
+import asyncio
+
+from aiogram.enums import ParseMode
+
+from constants import JOB_MAX_ATTEMPTS, JOB_POLL_INTERVAL, JOB_RETRY_DELAY, JOB_WORKERS
+from core.gemini import GeminiEnglight
+from core.loggers import main_logger as logger
+from core.retry import ErrorKind, classify_error
+from core.router import model_router
+from database.database import db
+from database.managers import TranslationJobManager
+from database.models import TranslationJob
+from telegram.sender import sender
+
+OUTAGE_MESSAGE = 'Gemini API is unavailable right now. I will answer as soon as it is back.'
+FAILED_MESSAGE = 'Oops, something went wrong with Gemini API request. Try again.'
+
+
+def is_outage(error: BaseException) -> bool:
+    kind, _ = classify_error(error)
+    return kind != ErrorKind.FATAL
+
+
+class TranslationJobQueue:
+    """
+    Очередь задач перевода в таблице `translation_jobs` с пулом из `workers` воркеров.
+
+    Обработчик сообщения только сохраняет задачу. Воркеры запрашивают Gemini и отправляют ответ
+    в исходный чат. Задачи, упавшие из-за недоступности Gemini или прокси, возвращаются в очередь
+    и выполняются повторно, когда у маршрутизатора снова есть здоровая модель.
+    """
+
+    def __init__(self, workers: int, poll_interval: float, retry_delay: float, max_attempts: int) -> None:
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+        self._wakeup = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    async def start(self, requeue: bool = True) -> None:
+        """`requeue=False` — не возвращать в очередь задачи в обработке (их может выполнять другой процесс)."""
+        if self.running:
+            return
+        if requeue:
+            async with db.async_session() as session:
+                requeued = await TranslationJobManager(session).requeue_processing()
+            if requeued:
+                logger.info('Requeued %s interrupted translation jobs', requeued)
+        self._tasks = [asyncio.create_task(self._worker(index)) for index in range(self.workers)]
+        logger.info('Translation job queue started with %s workers', self.workers)
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Задачи, прерванные на середине, вернутся в очередь при следующем запуске.
+
+    async def enqueue(self, chat_id: int, text: str, save_to_db: bool, message_id: int | None = None) -> None:
+        async with db.async_session() as session:
+            await TranslationJobManager(session).create(chat_id, text, save_to_db, message_id)
+        self._wakeup.set()
+
+    async def _wait(self) -> None:
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            try:
+                if not model_router.has_healthy_model():
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+                async with db.async_session() as session:
+                    job = await TranslationJobManager(session).claim_next()
+                if job is None:
+                    await self._wait()
+                    continue
+                await self.process(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error('Translation job worker %s failed: %s', index, e, exc_info=True)
+                await asyncio.sleep(self.poll_interval)
+
+    async def process(self, job: TranslationJob) -> None:
+        try:
+            answers = await GeminiEnglight(job.text, job.save_to_db, raise_errors=True)()
+        except Exception as e:
+            await self.handle_error(job, e)
+            return
+        await self.send(job, [str(answer) for answer in answers])
+        async with db.async_session() as session:
+            await TranslationJobManager(session).mark_done(job.id)
+
+    async def handle_error(self, job: TranslationJob, error: Exception) -> None:
+        async with db.async_session() as session:
+            manager = TranslationJobManager(session)
+            if is_outage(error) and job.attempts < self.max_attempts:
+                delay = min(self.retry_delay * 2 ** (job.attempts - 1), 10 * 60)
+                logger.warning('Translation job %s postponed for %s s: %s', job.id, delay, error)
+                await manager.retry_later(job.id, str(error), delay)
+                if job.attempts == 1:
+                    await self.send(job, [OUTAGE_MESSAGE])
+                return
+            logger.error('Translation job %s failed: %s', job.id, error)
+            await manager.mark_failed(job.id, str(error))
+        await self.send(job, [FAILED_MESSAGE])
+
+    async def send(self, job: TranslationJob, answers: list[str]) -> None:
+        for answer in answers:
+            try:
+                await sender.send_message(
+                    job.chat_id,
+                    answer,
+                    parse_mode=ParseMode.HTML,
+                    reply_to_message_id=job.message_id,
+                )
+            except Exception as e:
+                logger.error('Error sending answer for translation job %s: %s', job.id, e)
+
+    async def describe(self) -> str:
+        async with db.async_session() as session:
+            counts = await TranslationJobManager(session).count_by_status()
+        statuses = ', '.join(f'{status} {counts.get(status, 0)}' for status in TranslationJob.STATUSES)
+        return f'Translation jobs: {statuses}'
+
+
+job_queue = TranslationJobQueue(
+    workers=JOB_WORKERS,
+    poll_interval=JOB_POLL_INTERVAL,
+    retry_delay=JOB_RETRY_DELAY,
+    max_attempts=JOB_MAX_ATTEMPTS,
+)
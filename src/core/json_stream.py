@@ -0,0 +1,80 @@
+import json
+import re
+from typing import Any
+
+from core.loggers import main_logger as logger
+
+WORDS_ARRAY_RE = re.compile(r'"words"\s*:\s*\[')
+
+
+class WordsStreamParser:
+    """
+    Инкрементальный парсер ответа вида `{"words": [{...}, {...}]}`.
+
+    Текст подаётся кусками через `feed()`. Как только очередной элемент массива `words`
+    пришёл целиком, он возвращается распарсенным словарём, не дожидаясь конца ответа.
+    Обрамление (```json, пояснения модели) до массива игнорируется.
+    """
+
+    def __init__(self) -> None:
+        self.text = ''
+        self.position = 0
+        self.in_array = False
+        self.finished = False
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.item_start: int | None = None
+
+    def feed(self, chunk: str) -> list[dict[str, Any]]:
+        self.text += chunk
+        items: list[dict[str, Any]] = []
+        if self.finished:
+            return items
+        if not self.in_array:
+            match = WORDS_ARRAY_RE.search(self.text)
+            if not match:
+                return items
+            self.in_array = True
+            self.position = match.end()
+        text = self.text
+        for index in range(self.position, len(text)):
+            char = text[index]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                continue
+            if char == '"':
+                self.in_string = True
+            elif char in '{[':
+                if self.depth == 0 and char == '{':
+                    self.item_start = index
+                self.depth += 1
+            elif char in '}]':
+                if self.depth == 0 and char == ']':
+                    self.finished = True
+                    self.position = index + 1
+                    return items
+                self.depth -= 1
+                if self.depth == 0 and self.item_start is not None:
+                    item = self._load(text[self.item_start : index + 1])
+                    if item is not None:
+                        items.append(item)
+                    self.item_start = None
+        self.position = len(text)
+        return items
+
+    def _load(self, raw: str) -> dict[str, Any] | None:
+        try:
+            item = json.loads(raw)
+        except json.JSONDecodeError:
+            logger.error('JSON decoding error in streamed word: %s', raw)
+            return None
+        if not isinstance(item, dict):
+            logger.error('Expected a dictionary for streamed word, got: %s', raw)
+            return None
+        return item
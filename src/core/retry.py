@@ -0,0 +1,219 @@
+import asyncio
+import random
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import StrEnum
+from typing import Any, Awaitable, Callable, TypeVar
+
+from aiogram.exceptions import (
+    TelegramEntityTooLarge,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+
+from httpx import HTTPStatusError, RequestError, Response
+
+from constants import (
+    GEMINI_RETRY_ATTEMPTS,
+    GEMINI_RETRY_BASE_DELAY,
+    GEMINI_RETRY_DEADLINE,
+    GEMINI_RETRY_MAX_DELAY,
+    TELEGRAM_RETRY_ATTEMPTS,
+    TELEGRAM_RETRY_BASE_DELAY,
+    TELEGRAM_RETRY_DEADLINE,
+    TELEGRAM_RETRY_MAX_DELAY,
+)
+from core.loggers import main_logger as logger
+
+T = TypeVar('T')
+
+RATE_LIMIT_STATUSES = {429}
+SERVER_ERROR_STATUSES = {500, 502, 503, 504}
+# Момент (time.monotonic()), когда истекает бюджет текущего вызова `RetryPolicy.run`.
+deadline_at: ContextVar[float | None] = ContextVar('deadline_at', default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Бюджет политики повторов истёк во время попытки: сервис не ответил вовремя."""
+
+
+def deadline_expired() -> bool:
+    """Истёк ли бюджет текущего вызова `RetryPolicy.run` (отличает его от обычной отмены запроса)."""
+    expires_at = deadline_at.get()
+    return expires_at is not None and time.monotonic() >= expires_at
+
+
+class ErrorKind(StrEnum):
+    TRANSIENT = 'transient'
+    RATE_LIMITED = 'rate_limited'
+    FATAL = 'fatal'
+
+
+def get_retry_after(response: Response) -> float | None:
+    value = response.headers.get('Retry-After')
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+def classify_error(error: BaseException) -> tuple[ErrorKind, float | None]:
+    """Тип ошибки и пауза из `Retry-After` (если сервер её сообщил)."""
+    if isinstance(error, HTTPStatusError):
+        status_code = error.response.status_code
+        if status_code in RATE_LIMIT_STATUSES:
+            return ErrorKind.RATE_LIMITED, get_retry_after(error.response)
+        if status_code in SERVER_ERROR_STATUSES:
+            return ErrorKind.TRANSIENT, get_retry_after(error.response)
+        return ErrorKind.FATAL, None
+    if isinstance(error, (RequestError, DeadlineExceeded)):
+        return ErrorKind.TRANSIENT, None
+    if isinstance(error, TelegramRetryAfter):
+        return ErrorKind.RATE_LIMITED, float(error.retry_after)
+    if isinstance(error, TelegramEntityTooLarge):
+        return ErrorKind.FATAL, None
+    if isinstance(error, (TelegramNetworkError, TelegramServerError)):
+        return ErrorKind.TRANSIENT, None
+    return ErrorKind.FATAL, None
+
+
+def classify_rate_limit_only(error: BaseException) -> tuple[ErrorKind, float | None]:
+    """
+    Классификация для неидемпотентных запросов (например, `sendMessage`): повторяется только rate limit,
+    при котором запрос точно не выполнен. После сетевой ошибки или 5xx сообщение могло уже уйти.
+    """
+    kind, retry_after = classify_error(error)
+    if kind == ErrorKind.RATE_LIMITED:
+        return kind, retry_after
+    return ErrorKind.FATAL, None
+
+
+@dataclass
+class PolicyStats:
+    calls: int = 0
+    attempts: int = 0
+    retries: int = 0
+    successes: int = 0
+    failures: int = 0
+    by_kind: dict[str, int] = field(default_factory=dict)
+
+
+class RetryPolicy:
+    """
+    Политика повторов: экспоненциальная пауза с full jitter, учёт `Retry-After`
+    и общий бюджет времени на запрос (`deadline`, в секундах).
+
+    Повторяются только временные ошибки и ошибки rate limit, фатальные пробрасываются сразу.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_attempts: int,
+        base_delay: float,
+        max_delay: float,
+        deadline: float | None = None,
+        classify: Callable[[BaseException], tuple[ErrorKind, float | None]] = classify_error,
+    ) -> None:
+        self.name = name
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.classify = classify
+        self.stats = PolicyStats()
+
+    def backoff(self, attempt: int, retry_after: float | None = None) -> float:
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    async def run(self, func: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+        self.stats.calls += 1
+        started_at = time.monotonic()
+        token = deadline_at.set(None if self.deadline is None else started_at + self.deadline)
+        try:
+            return await self._run(started_at, func, *args, **kwargs)
+        finally:
+            deadline_at.reset(token)
+
+    async def _run(self, started_at: float, func: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+        attempt = 0
+        while True:
+            attempt += 1
+            self.stats.attempts += 1
+            # Бюджет ограничивает и саму попытку: иначе один запрос может превысить его на весь HTTP-таймаут.
+            remaining = None if self.deadline is None else self.deadline - (time.monotonic() - started_at)
+            timeout = asyncio.timeout(remaining)
+            try:
+                async with timeout:
+                    result = await func(*args, **kwargs)
+            except Exception as e:
+                if timeout.expired():
+                    self.stats.failures += 1
+                    logger.error(
+                        f'Политика "{self.name}": исчерпан бюджет {self.deadline} с во время попытки {attempt}.'
+                    )
+                    raise DeadlineExceeded(f'Retry policy "{self.name}" deadline of {self.deadline} s exceeded') from e
+                kind, retry_after = self.classify(e)
+                self.stats.by_kind[kind] = self.stats.by_kind.get(kind, 0) + 1
+                if kind == ErrorKind.FATAL or attempt >= self.max_attempts:
+                    self.stats.failures += 1
+                    logger.error(
+                        f'Политика "{self.name}": вызов не удался после {attempt} попыток. Последняя ошибка: {e!r}'
+                    )
+                    raise
+                delay = self.backoff(attempt, retry_after)
+                elapsed = time.monotonic() - started_at
+                if self.deadline is not None and elapsed + delay > self.deadline:
+                    self.stats.failures += 1
+                    logger.error(
+                        f'Политика "{self.name}": исчерпан бюджет {self.deadline} с '
+                        f'(прошло {elapsed:.1f} с, пауза {delay:.1f} с). Последняя ошибка: {e!r}'
+                    )
+                    raise
+                self.stats.retries += 1
+                logger.warning(
+                    f'Политика "{self.name}": ошибка ({kind}) {e!r}\n'
+                    f'Попытка {attempt} из {self.max_attempts}. Жду {delay:.2f} секунд...'
+                )
+                await asyncio.sleep(delay)
+                continue
+            self.stats.successes += 1
+            return result
+
+    def describe(self) -> str:
+        kinds = ', '.join(f'{kind} {count}' for kind, count in self.stats.by_kind.items()) or 'no errors'
+        return (
+            f'Retry policy "{self.name}": calls {self.stats.calls}, attempts {self.stats.attempts}, '
+            f'retries {self.stats.retries}, failures {self.stats.failures} ({kinds})'
+        )
+
+
+gemini_retry_policy = RetryPolicy(
+    name='gemini',
+    max_attempts=GEMINI_RETRY_ATTEMPTS,
+    base_delay=GEMINI_RETRY_BASE_DELAY,
+    max_delay=GEMINI_RETRY_MAX_DELAY,
+    deadline=GEMINI_RETRY_DEADLINE,
+)
+telegram_retry_policy = RetryPolicy(
+    name='telegram',
+    max_attempts=TELEGRAM_RETRY_ATTEMPTS,
+    base_delay=TELEGRAM_RETRY_BASE_DELAY,
+    max_delay=TELEGRAM_RETRY_MAX_DELAY,
+    deadline=TELEGRAM_RETRY_DEADLINE,
+)
+telegram_send_retry_policy = RetryPolicy(
+    name='telegram-send',
+    max_attempts=TELEGRAM_RETRY_ATTEMPTS,
+    base_delay=TELEGRAM_RETRY_BASE_DELAY,
+    max_delay=TELEGRAM_RETRY_MAX_DELAY,
+    deadline=TELEGRAM_RETRY_DEADLINE,
+    classify=classify_rate_limit_only,
+)
@@ -0,0 +1,230 @@
+import math
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from enum import StrEnum
+from typing import Any, Iterable
+
+from constants import (
+    GEMINI_MODELS,
+    ROUTER_COOLDOWN,
+    ROUTER_ERROR_RATE_THRESHOLD,
+    ROUTER_EWMA_ALPHA,
+    ROUTER_FAILURE_THRESHOLD,
+    ROUTER_LATENCY_WINDOW,
+    ROUTER_RATE_LIMIT_COOLDOWN,
+)
+from core.loggers import main_logger as logger
+from core.retry import RATE_LIMIT_STATUSES
+
+
+class CircuitState(StrEnum):
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+
+@dataclass
+class ModelStats:
+    model: str
+    ewma_latency: float | None = None
+    error_rate: float = 0.0
+    requests: int = 0
+    failures: int = 0
+    rate_limited: int = 0
+    consecutive_failures: int = 0
+    state: CircuitState = CircuitState.CLOSED
+    opened_at: float | None = None
+    rate_limited_until: float = 0.0
+    probe_in_flight: bool = field(default=False, repr=False)
+    latencies: deque[float] = field(default_factory=lambda: deque(maxlen=ROUTER_LATENCY_WINDOW), repr=False)
+
+
+class ModelRouter:
+    """
+    Маршрутизатор запросов между моделями Gemini.
+
+    Для каждой модели хранит EWMA задержки, EWMA доли ошибок и сигналы rate limit (429).
+    Выбирает самую быструю здоровую модель. Падающие модели выводятся из ротации (circuit breaker)
+    и после `cooldown` секунд получают один пробный запрос (half-open).
+    """
+
+    def __init__(
+        self,
+        models: Iterable[str],
+        alpha: float,
+        failure_threshold: int,
+        error_rate_threshold: float,
+        cooldown: float,
+        rate_limit_cooldown: float,
+    ) -> None:
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.cooldown = cooldown
+        self.rate_limit_cooldown = rate_limit_cooldown
+        self.stats: dict[str, ModelStats] = {model: ModelStats(model=model) for model in models}
+
+    def _ewma(self, current: float | None, value: float) -> float:
+        if current is None:
+            return value
+        return self.alpha * value + (1 - self.alpha) * current
+
+    def _is_available(self, stats: ModelStats, now: float) -> bool:
+        if stats.rate_limited_until > now:
+            return False
+        if stats.state == CircuitState.OPEN:
+            if stats.opened_at is not None and now - stats.opened_at >= self.cooldown:
+                stats.state = CircuitState.HALF_OPEN
+                logger.info('Circuit for model %s is half-open, sending probe request', stats.model)
+            else:
+                return False
+        if stats.state == CircuitState.HALF_OPEN:
+            return not stats.probe_in_flight
+        return True
+
+    def _score(self, stats: ModelStats) -> float:
+        # Модели без статистики пробуем первыми, чтобы собрать по ним данные.
+        if stats.ewma_latency is None:
+            return 0.0
+        return stats.ewma_latency * (1 + stats.error_rate * 10)
+
+    def choose(self, exclude: Iterable[str] = ()) -> str:
+        now = time.monotonic()
+        excluded = set(exclude)
+        candidates = [s for s in self.stats.values() if s.model not in excluded and self._is_available(s, now)]
+        if not candidates:
+            # Здоровых моделей нет: берём ту, что раньше всех выйдет из паузы.
+            fallback = [s for s in self.stats.values() if s.model not in excluded] or list(self.stats.values())
+            stats = min(fallback, key=lambda s: max(s.rate_limited_until, (s.opened_at or 0) + self.cooldown))
+            logger.warning('No healthy Gemini models available, falling back to %s', stats.model)
+            return stats.model
+        probes = [s for s in candidates if s.state == CircuitState.HALF_OPEN]
+        if probes:
+            stats = probes[0]
+            stats.probe_in_flight = True
+            return stats.model
+        return min(candidates, key=self._score).model
+
+    def has_healthy_model(self) -> bool:
+        """Есть ли модель, которой сейчас можно отправить запрос (без учёта пробных слотов)."""
+        now = time.monotonic()
+        return any(
+            stats.rate_limited_until <= now
+            and (
+                stats.state != CircuitState.OPEN
+                or (stats.opened_at is not None and now - stats.opened_at >= self.cooldown)
+            )
+            for stats in self.stats.values()
+        )
+
+    def _get(self, model: str) -> ModelStats:
+        if model not in self.stats:
+            self.stats[model] = ModelStats(model=model)
+        return self.stats[model]
+
+    def record_success(self, model: str, latency: float) -> None:
+        stats = self._get(model)
+        stats.requests += 1
+        stats.ewma_latency = self._ewma(stats.ewma_latency, latency)
+        stats.error_rate = self._ewma(stats.error_rate, 0.0)
+        stats.latencies.append(latency)
+        stats.consecutive_failures = 0
+        stats.probe_in_flight = False
+        if stats.state != CircuitState.CLOSED:
+            logger.info('Circuit for model %s is closed again', model)
+        stats.state = CircuitState.CLOSED
+        stats.opened_at = None
+
+    def record_failure(
+        self,
+        model: str,
+        latency: float,
+        status_code: int | None = None,
+        retry_after: float | None = None,
+    ) -> None:
+        stats = self._get(model)
+        now = time.monotonic()
+        stats.requests += 1
+        stats.failures += 1
+        stats.consecutive_failures += 1
+        stats.probe_in_flight = False
+        # Таймауты и ошибки тоже учитываем в задержке, иначе зависшая модель выглядит быстрой.
+        stats.ewma_latency = self._ewma(stats.ewma_latency, latency)
+        stats.error_rate = self._ewma(stats.error_rate, 1.0)
+        if status_code in RATE_LIMIT_STATUSES:
+            stats.rate_limited += 1
+            stats.rate_limited_until = now + (retry_after if retry_after is not None else self.rate_limit_cooldown)
+            logger.warning('Model %s is rate limited for %.1f s', model, stats.rate_limited_until - now)
+            return
+        if (
+            stats.state == CircuitState.HALF_OPEN
+            or stats.consecutive_failures >= self.failure_threshold
+            or stats.error_rate >= self.error_rate_threshold
+        ):
+            if stats.state != CircuitState.OPEN:
+                logger.warning('Circuit for model %s is open for %.1f s', model, self.cooldown)
+            stats.state = CircuitState.OPEN
+            stats.opened_at = now
+
+    def release(self, model: str) -> None:
+        """Запрос к модели отменён без результата: освобождаем слот пробного запроса."""
+        self._get(model).probe_in_flight = False
+
+    @staticmethod
+    def _percentile(samples: list[float], percentile: float) -> float | None:
+        if not samples:
+            return None
+        samples = sorted(samples)
+        index = max(0, math.ceil(percentile / 100 * len(samples)) - 1)
+        return samples[min(index, len(samples) - 1)]
+
+    def latency_percentile(self, percentile: float, model: str | None = None, min_samples: int = 1) -> float | None:
+        """
+        Перцентиль задержки успешных ответов.
+
+        Берутся замеры модели `model`, а если их меньше `min_samples` — замеры всех моделей.
+        """
+        samples = list(self.stats[model].latencies) if model in self.stats else []
+        if len(samples) < min_samples:
+            samples = [latency for stats in self.stats.values() for latency in stats.latencies]
+        if len(samples) < min_samples:
+            return None
+        return self._percentile(samples, percentile)
+
+    def snapshot(self) -> list[dict[str, Any]]:
+        now = time.monotonic()
+        result = []
+        for stats in self.stats.values():
+            data = asdict(stats)
+            data.pop('probe_in_flight')
+            data.pop('latencies')
+            data['p95_latency'] = self._percentile(list(stats.latencies), 95)
+            data['rate_limited_for'] = round(max(0.0, stats.rate_limited_until - now), 1)
+            data.pop('rate_limited_until')
+            data.pop('opened_at')
+            result.append(data)
+        return result
+
+    def describe(self) -> str:
+        lines = []
+        for data in self.snapshot():
+            latency = f'{data["ewma_latency"]:.2f}s' if data['ewma_latency'] is not None else '-'
+            p95 = f'{data["p95_latency"]:.2f}s' if data['p95_latency'] is not None else '-'
+            lines.append(
+                f'<b>{data["model"]}</b>: {data["state"]}, latency {latency} (p95 {p95}), '
+                f'errors {data["error_rate"]:.0%}, requests {data["requests"]}, '
+                f'failures {data["failures"]}, 429: {data["rate_limited"]}'
+                + (f', paused {data["rate_limited_for"]}s' if data['rate_limited_for'] else '')
+            )
+        return '\n'.join(lines)
+
+
+model_router = ModelRouter(
+    models=GEMINI_MODELS,
+    alpha=ROUTER_EWMA_ALPHA,
+    failure_threshold=ROUTER_FAILURE_THRESHOLD,
+    error_rate_threshold=ROUTER_ERROR_RATE_THRESHOLD,
+    cooldown=ROUTER_COOLDOWN,
+    rate_limit_cooldown=ROUTER_RATE_LIMIT_COOLDOWN,
+)
@@ -1,39 +1,101 @@
+import asyncio
+from datetime import timedelta
+
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.types import BufferedInputFile
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
-from constants import ADMIN_ID, SCHEDULED_TIMES, UTC
+from constants import (
+    ADMIN_ID,
+    FSM_SWEEP_INTERVAL,
+    REVIEW_BATCH_SIZE,
+    REVIEW_TTS_CONCURRENCY,
+    SCHEDULED_TIMES,
+    TRANSLATION_CACHE_DB_TTL,
+    UTC,
+)
+from core.loggers import main_logger as logger
+from core.tts_cache import audio_cache
 from database.database import db
-from database.managers import WordProgressManager
-from telegram.bot import bot
+from database.managers import CachedTranslationManager, WordManager, WordProgressManager, WordSnapshot, word_cache
+from database.models import Word
 from telegram.buttons import make_know_or_not_buttons
-from utils import text_to_speech
+from telegram.sender import Priority, sender
+from telegram.storage import storage
 
 
 def setup_scheduler():
     scheduler = AsyncIOScheduler(timezone=UTC)
     for t in SCHEDULED_TIMES:
         scheduler.add_job(send_word_reviews, 'cron', hour=t.hour, minute=t.minute)
+    scheduler.add_job(delete_expired_translations, 'cron', hour=3, minute=0)
+    scheduler.add_job(storage.sweep, 'interval', minutes=FSM_SWEEP_INTERVAL)
     scheduler.start()
 
 
-async def send_word_reviews():
+async def delete_expired_translations():
     async with db.async_session() as session:
-        word_progress_manager = WordProgressManager(session)
-        word_progresses = await word_progress_manager.get_next_review_words()
-        if not word_progresses:
-            await bot.send_message(chat_id=ADMIN_ID, text='No words to review at this time.')
+        await CachedTranslationManager(session).delete_expired(timedelta(seconds=TRANSLATION_CACHE_DB_TTL))
+
+
+async def prepare_audio(word: Word, semaphore: asyncio.Semaphore) -> bytes | None:
+    """Готовит mp3 заранее, пока отправляются предыдущие слова. Для слов с `file_id` загрузка не нужна."""
+    if word.voice_file_id or not word.word:
+        return None
+    async with semaphore:
+        return await audio_cache.get_or_create(word.word)
+
+
+async def send_word_voice(word: Word, chat_id: int | str, audio: bytes | None = None) -> None:
+    """Отправляет озвучку слова: по сохранённому `file_id`, а если его нет или он устарел — загружает mp3."""
+    if word.voice_file_id:
+        try:
+            await sender.send_voice(chat_id, word.voice_file_id, Priority.SCHEDULED)
             return
-        for word_progress in word_progresses:
-            if not word_progress.word.word:
-                continue
-            audio = await text_to_speech(word_progress.word.word)
-            await bot.send_voice(
-                chat_id=ADMIN_ID,
-                voice=BufferedInputFile(audio, filename=f'{word_progress.word.word}.mp3'),
-            )
-            await bot.send_message(
-                chat_id=ADMIN_ID,
-                text=word_progress.word.word,
-                reply_markup=make_know_or_not_buttons(word_progress.word.id),
-            )
+        except TelegramBadRequest as e:
+            logger.warning('Stale voice file_id for word "%s", uploading audio again: %s', word.word, e)
+    if audio is None:
+        audio = await audio_cache.get_or_create(word.word)  # type: ignore[arg-type]
+    message = await sender.send_voice(
+        chat_id,
+        BufferedInputFile(audio, filename=f'{word.word}.mp3'),
+        Priority.SCHEDULED,
+    )
+    if message.voice:
+        word.voice_file_id = message.voice.file_id
+        async with db.async_session() as session:
+            await WordManager(session).set_voice_file_id(word.id, message.voice.file_id)
+
+
+async def send_word_reviews(limit: int = REVIEW_BATCH_SIZE):
+    async with db.async_session() as session:
+        word_progress_manager = WordProgressManager(session)
+        word_progresses = await word_progress_manager.get_next_review_words(limit=limit)
+    if not word_progresses:
+        await sender.send_message(ADMIN_ID, 'No words to review at this time.', Priority.SCHEDULED)
+        return
+    words = [word_progress.word for word_progress in word_progresses if word_progress.word.word]
+    # Слова уже загружены с примерами: кладём их в кэш, чтобы ответ на кнопки повторения не ходил в БД.
+    for word in words:
+        word_cache.set(WordSnapshot.from_word(word))
+    # Озвучка генерируется параллельно (не больше REVIEW_TTS_CONCURRENCY одновременно),
+    # а отправка идёт строго по порядку через очередь исходящих сообщений с низким приоритетом.
+    semaphore = asyncio.Semaphore(REVIEW_TTS_CONCURRENCY)
+    audio_tasks = [asyncio.create_task(prepare_audio(word, semaphore)) for word in words]
+    try:
+        for word, audio_task in zip(words, audio_tasks):
+            try:
+                audio = await audio_task
+                await send_word_voice(word, ADMIN_ID, audio)
+                await sender.send_message(
+                    ADMIN_ID,
+                    word.word,  # type: ignore[arg-type]
+                    Priority.SCHEDULED,
+                    reply_markup=make_know_or_not_buttons(word.id),
+                )
+            except Exception as e:
+                logger.error('Error sending review for word "%s": %s', word.word, e)
+    finally:
+        for audio_task in audio_tasks:
+            audio_task.cancel()
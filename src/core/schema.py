@@ -0,0 +1,118 @@
+import json
+import types
+from dataclasses import fields, is_dataclass
+from typing import Any, Callable, Union, get_args, get_origin, get_type_hints
+
+from core.data_types import ExampleData, WordData
+
+try:
+    import orjson
+
+    json_loads: Callable[[str | bytes], Any] = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+
+class WordValidationError(ValueError):
+    pass
+
+
+def _type_schema(annotation: Any) -> dict[str, Any]:
+    origin = get_origin(annotation)
+    args = get_args(annotation)
+    if origin in (Union, types.UnionType) and type(None) in args:
+        (inner,) = [arg for arg in args if arg is not type(None)]
+        return {**_type_schema(inner), 'nullable': True}
+    if origin is list:
+        return {'type': 'ARRAY', 'items': _type_schema(args[0])}
+    if is_dataclass(annotation):
+        return dataclass_schema(annotation)  # type: ignore[arg-type]
+    if annotation is str:
+        return {'type': 'STRING'}
+    raise TypeError(f'Unsupported type for response schema: {annotation}')
+
+
+def dataclass_schema(cls: type) -> dict[str, Any]:
+    """Схема `responseSchema` (подмножество OpenAPI, которое понимает Gemini) для dataclass."""
+    hints = get_type_hints(cls)
+    names = [field.name for field in fields(cls)]
+    return {
+        'type': 'OBJECT',
+        'properties': {name: _type_schema(hints[name]) for name in names},
+        'required': names,
+        'propertyOrdering': names,
+    }
+
+
+WORDS_RESPONSE_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {'words': {'type': 'ARRAY', 'items': dataclass_schema(WordData)}},
+    'required': ['words'],
+}
+
+STRUCTURED_GENERATION_CONFIG = {
+    'responseMimeType': 'application/json',
+    'responseSchema': WORDS_RESPONSE_SCHEMA,
+}
+
+WORD_FIELDS = ('word', 'transcription', 'translation', 'part_of_speech', 'forms', 'explanation')
+
+
+def _optional_str(raw: dict, key: str) -> str | None:
+    value = raw.get(key)
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        return str(value)
+    raise WordValidationError(f'Field "{key}" must be a string, got: {type(value).__name__}')
+
+
+def validate_word(raw: Any) -> WordData:
+    """Проверяет одну запись из `words` и сразу собирает `WordData` без промежуточных копий."""
+    if not isinstance(raw, dict):
+        raise WordValidationError(f'Expected a dictionary for word, got: {type(raw).__name__}')
+    raw_examples = raw.get('examples') or []
+    if not isinstance(raw_examples, list):
+        raise WordValidationError(f'Field "examples" must be a list, got: {type(raw_examples).__name__}')
+    examples = []
+    for raw_example in raw_examples:
+        if not isinstance(raw_example, dict):
+            raise WordValidationError(f'Expected a dictionary for example, got: {type(raw_example).__name__}')
+        examples.append(
+            ExampleData(
+                example=_optional_str(raw_example, 'example'),
+                translation=_optional_str(raw_example, 'translation'),
+            )
+        )
+    word, transcription, translation, part_of_speech, forms, explanation = (
+        _optional_str(raw, key) for key in WORD_FIELDS
+    )
+    return WordData(
+        word=word,
+        transcription=transcription,
+        translation=translation,
+        part_of_speech=part_of_speech,
+        forms=forms,
+        explanation=explanation,
+        examples=examples,
+    )
+
+
+def parse_words(text: str | bytes) -> tuple[list[WordData], list[str]]:
+    """
+    Разбирает ответ вида `{"words": [...]}` за один проход.
+
+    Возвращает корректные слова и описания ошибок по каждой битой записи.
+    Если сам JSON не разбирается, выбрасывает `ValueError`.
+    """
+    data = json_loads(text)
+    if not isinstance(data, dict) or not isinstance(data.get('words', []), list):
+        raise ValueError('Expected a JSON object with "words" list')
+    words: list[WordData] = []
+    errors: list[str] = []
+    for raw in data.get('words', []):
+        try:
+            words.append(validate_word(raw))
+        except WordValidationError as e:
+            errors.append(f'Error creating WordData from word: {raw}\nError: {e}')
+    return words, errors
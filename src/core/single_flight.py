@@ -0,0 +1,37 @@
+import asyncio
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+
+class SingleFlight(Generic[K, V]):
+    """
+    Объединяет одновременные вызовы с одинаковым ключом в один.
+
+    Первый вызов запускает `func` отдельной задачей, остальные ждут её результат (или исключение).
+    Отмена одного из ожидающих не отменяет общий вызов.
+    """
+
+    def __init__(self) -> None:
+        self._in_flight: dict[K, asyncio.Task[V]] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: K, func: Callable[[], Awaitable[V]]) -> V:
+        task = self._in_flight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(func())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def describe(self) -> str:
+        return f'Gemini calls: {self.calls}, coalesced: {self.coalesced}, in flight: {self.in_flight}'
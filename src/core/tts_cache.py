@@ -0,0 +1,140 @@
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from pathlib import Path
+
+from constants import TTS_CACHE_DIR, TTS_CACHE_MAX_BYTES
+from core.loggers import main_logger as logger
+from core.single_flight import SingleFlight
+from database.managers import WordManager
+from database.models import Word
+from utils import text_to_speech
+
+
+class AudioCache:
+    """
+    Кэш озвучки gTTS на диске, адресуемый по содержимому (ключ — хэш текста и языка).
+
+    Размер ограничен `max_bytes`: при переполнении удаляются давно не читавшиеся файлы (LRU по mtime).
+    Озвучка новых слов генерируется в фоне сразу после сохранения слова.
+    """
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[str, int] = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.loaded = False
+        self._flight: SingleFlight[str, bytes] = SingleFlight()
+        self._tasks: set[asyncio.Task] = set()
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def make_key(text: str, lang: str) -> str:
+        return hashlib.sha256(f'{lang}:{text}'.encode()).hexdigest()
+
+    def path(self, key: str) -> Path:
+        return self.directory / f'{key}.mp3'
+
+    def _load_sync(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        files = sorted(self.directory.glob('*.mp3'), key=lambda file: file.stat().st_mtime)
+        for file in files:
+            size = file.stat().st_size
+            self.entries[file.stem] = size
+            self.size += size
+
+    async def load(self) -> None:
+        if self.loaded:
+            return
+        async with self._lock:
+            if self.loaded:
+                return
+            await asyncio.to_thread(self._load_sync)
+            self.loaded = True
+        logger.info('TTS cache loaded: %s files, %s bytes', len(self.entries), self.size)
+
+    def _read_sync(self, key: str) -> bytes | None:
+        path = self.path(key)
+        try:
+            audio = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        os.utime(path)
+        return audio
+
+    def _write_sync(self, key: str, audio: bytes) -> None:
+        tmp_path = self.path(key).with_suffix('.tmp')
+        tmp_path.write_bytes(audio)
+        tmp_path.replace(self.path(key))
+
+    def _evict_sync(self, keys: list[str]) -> None:
+        for key in keys:
+            self.path(key).unlink(missing_ok=True)
+
+    async def get(self, text: str, lang: str = 'en') -> bytes | None:
+        await self.load()
+        key = self.make_key(text, lang)
+        if key not in self.entries:
+            return None
+        audio = await asyncio.to_thread(self._read_sync, key)
+        if audio is None:
+            self.size -= self.entries.pop(key)
+            return None
+        self.entries.move_to_end(key)
+        return audio
+
+    async def put(self, text: str, audio: bytes, lang: str = 'en') -> None:
+        await self.load()
+        key = self.make_key(text, lang)
+        await asyncio.to_thread(self._write_sync, key, audio)
+        self.size += len(audio) - self.entries.pop(key, 0)
+        self.entries[key] = len(audio)
+        evicted = []
+        while self.size > self.max_bytes and len(self.entries) > 1:
+            old_key, old_size = self.entries.popitem(last=False)
+            self.size -= old_size
+            evicted.append(old_key)
+        if evicted:
+            await asyncio.to_thread(self._evict_sync, evicted)
+            logger.info('TTS cache evicted %s files', len(evicted))
+
+    async def _generate(self, text: str, lang: str) -> bytes:
+        audio = await text_to_speech(text, lang)
+        await self.put(text, audio, lang)
+        return audio
+
+    async def get_or_create(self, text: str, lang: str = 'en') -> bytes:
+        audio = await self.get(text, lang)
+        if audio is not None:
+            self.hits += 1
+            return audio
+        self.misses += 1
+        return await self._flight.do(self.make_key(text, lang), lambda: self._generate(text, lang))
+
+    async def _precompute(self, text: str) -> None:
+        try:
+            await self.get_or_create(text)
+        except Exception as e:
+            logger.error('Error generating TTS audio for "%s": %s', text, e)
+
+    def schedule(self, word: Word) -> None:
+        """Хук `WordManager.created_hooks`: озвучка нового слова генерируется в фоне."""
+        if not word.word:
+            return
+        task = asyncio.get_running_loop().create_task(self._precompute(word.word))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def describe(self) -> str:
+        return (
+            f'TTS cache: {len(self.entries)} files, {self.size / 1024 / 1024:.1f} MiB, '
+            f'hits {self.hits}, misses {self.misses}'
+        )
+
+
+audio_cache = AudioCache(directory=TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_BYTES)
+WordManager.created_hooks.append(audio_cache.schedule)
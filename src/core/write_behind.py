@@ -0,0 +1,81 @@
+import asyncio
+
+from constants import WRITE_BEHIND_BATCH_SIZE, WRITE_BEHIND_QUEUE_SIZE
+from core.data_types import WordData
+from core.loggers import main_logger as logger
+from database.database import db
+from database.managers import WordManager
+
+
+class WordWriter:
+    """
+    Фоновая запись новых слов в БД (write-behind).
+
+    Обработчики кладут `WordData` в ограниченную очередь и сразу отвечают пользователю;
+    если очередь заполнена, `put()` ждёт освобождения места. Воркер забирает слова пачками
+    и сохраняет их через `WordManager.bulk_create_from_data`. При остановке очередь дописывается до конца.
+    """
+
+    def __init__(self, queue_size: int, batch_size: int) -> None:
+        self.batch_size = batch_size
+        self.queue: asyncio.Queue[WordData] = asyncio.Queue(maxsize=queue_size)
+        self.written = 0
+        self.failed = 0
+        self._worker: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    @property
+    def depth(self) -> int:
+        return self.queue.qsize()
+
+    def start(self) -> None:
+        if not self.running:
+            self._worker = asyncio.create_task(self._run())
+            logger.info('Write-behind worker started')
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        logger.info('Flushing write-behind queue: %s words', self.depth)
+        await self.queue.join()
+        self._worker.cancel()  # type: ignore[union-attr]
+        try:
+            await self._worker  # type: ignore[misc]
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        logger.info('Write-behind worker stopped')
+
+    async def put(self, words_data: list[WordData]) -> None:
+        for word_data in words_data:
+            await self.queue.put(word_data)
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                await self.write(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def write(self, batch: list[WordData]) -> None:
+        try:
+            async with db.async_session() as session:
+                created = await WordManager(session).bulk_create_from_data(batch)
+            self.written += len(created)
+            logger.info('Write-behind: created %s of %s word objects', len(created), len(batch))
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error('Write-behind: error creating word objects: %s\nError: %s', batch, e)
+
+    def describe(self) -> str:
+        return f'Write-behind queue: depth {self.depth}, written {self.written}, failed {self.failed}'
+
+
+word_writer = WordWriter(queue_size=WRITE_BEHIND_QUEUE_SIZE, batch_size=WRITE_BEHIND_BATCH_SIZE)
@@ -1,13 +1,100 @@
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 
-from constants import DATABASE_URL
+from constants import (
+    DATABASE_URL,
+    DB_ENGINE_PROFILE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_SQLITE_BUSY_TIMEOUT_MS,
+    DB_SQLITE_CACHE_SIZE_KIB,
+    DB_SQLITE_MMAP_SIZE,
+    DB_SQLITE_SYNCHRONOUS,
+    DB_STATEMENT_CACHE_SIZE,
+)
 from database.models import Base
 
 
+@dataclass(frozen=True)
+class EngineProfile:
+    """
+    Настройки движка для конкретной СУБД: аргументы `create_async_engine`, параметры URL
+    и PRAGMA, которые выполняются на каждом новом соединении SQLite.
+    """
+
+    name: str
+    engine_kwargs: dict[str, Any] = field(default_factory=dict)
+    url_query: dict[str, str] = field(default_factory=dict)
+    pragmas: dict[str, Any] = field(default_factory=dict)
+
+
+ENGINE_PROFILES = {
+    'plain': EngineProfile('plain'),
+    # WAL позволяет читать во время записи; с synchronous=NORMAL в WAL данные не теряются при падении процесса.
+    'sqlite': EngineProfile(
+        'sqlite',
+        pragmas={
+            'journal_mode': 'WAL',
+            'synchronous': DB_SQLITE_SYNCHRONOUS,
+            'mmap_size': DB_SQLITE_MMAP_SIZE,
+            'cache_size': -DB_SQLITE_CACHE_SIZE_KIB,
+            'busy_timeout': DB_SQLITE_BUSY_TIMEOUT_MS,
+        },
+    ),
+    'postgresql': EngineProfile(
+        'postgresql',
+        engine_kwargs={
+            'pool_size': DB_POOL_SIZE,
+            'max_overflow': DB_MAX_OVERFLOW,
+            'pool_timeout': DB_POOL_TIMEOUT,
+            'pool_recycle': DB_POOL_RECYCLE,
+            'pool_pre_ping': DB_POOL_PRE_PING,
+            'connect_args': {'statement_cache_size': DB_STATEMENT_CACHE_SIZE},
+        },
+        url_query={'prepared_statement_cache_size': str(DB_STATEMENT_CACHE_SIZE)},
+    ),
+}
+
+
+def resolve_profile(name: str, url: str) -> EngineProfile:
+    if name == 'auto':
+        engine_url = make_url(url)
+        backend = engine_url.get_backend_name()
+        # Профиль postgresql рассчитан на asyncpg (statement_cache_size — его параметр).
+        if backend == 'postgresql' and engine_url.get_driver_name() != 'asyncpg':
+            return ENGINE_PROFILES['plain']
+        return ENGINE_PROFILES.get(backend, ENGINE_PROFILES['plain'])
+    if name not in ENGINE_PROFILES:
+        raise ValueError(f'Unknown database engine profile: {name}')
+    return ENGINE_PROFILES[name]
+
+
+def set_sqlite_pragmas(engine: AsyncEngine, pragmas: dict[str, Any]) -> None:
+    @event.listens_for(engine.sync_engine, 'connect')
+    def on_connect(dbapi_connection: Any, connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+
 class Database:
-    def __init__(self, url: str) -> None:
+    def __init__(self, url: str, profile: EngineProfile | str = 'auto') -> None:
+        self.profile = resolve_profile(profile, url) if isinstance(profile, str) else profile
         self.url = url
-        self.engine: AsyncEngine = create_async_engine(self.url, echo=False)
+        engine_url = make_url(url)
+        if self.profile.url_query:
+            engine_url = engine_url.update_query_dict(self.profile.url_query)
+        self.engine: AsyncEngine = create_async_engine(engine_url, echo=False, **self.profile.engine_kwargs)
+        if self.profile.pragmas:
+            set_sqlite_pragmas(self.engine, self.profile.pragmas)
         self.async_session = async_sessionmaker(
             bind=self.engine,
             expire_on_commit=False,
@@ -22,4 +109,4 @@ class Database:
         await self.engine.dispose()
 
 
-db = Database(DATABASE_URL)
+db = Database(DATABASE_URL, DB_ENGINE_PROFILE)
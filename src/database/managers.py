@@ -1,13 +1,29 @@
-from datetime import datetime
-from typing import Generic, Optional, Sequence, TypeVar
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, ClassVar, Generic, Optional, Sequence, TypeVar
 
-from sqlalchemy import func, select
+from sqlalchemy import ColumnElement, DateTime, case, delete, func, insert, literal, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from constants import UTC
+from constants import REPETITION_INTERVALS, REVIEW_BATCH_SIZE, UTC, WORD_CACHE_ENABLED, WORD_CACHE_SIZE
 from core.data_types import WordData
-from database.models import Example, Prompt, Word, WordProgress
+from core.loggers import main_logger as logger
+from database.models import (
+    CachedTranslation,
+    Example,
+    FSMRecord,
+    Prompt,
+    ReviewEvent,
+    TranslationJob,
+    Word,
+    WordProgress,
+    default_next_review,
+)
 
 T = TypeVar('T')
 
@@ -20,25 +36,100 @@ class Manager(Generic[T]):
     async def get(self, obj_id: int) -> Optional[T]:
         return await self.session.get(self.model, obj_id)
 
+    def invalidate(self, obj_id: int | None) -> None:
+        """Вызывается после любой записи через менеджер; менеджеры с кэшем сбрасывают в нём объект."""
+
     async def save(self, obj: T) -> None:
         self.session.add(obj)
         await self.session.commit()
+        self.invalidate(getattr(obj, 'id', None))
 
     async def delete(self, obj_id: int) -> None:
         obj = await self.session.get(self.model, obj_id)
         if obj:
             await self.session.delete(obj)
             await self.session.commit()
+        self.invalidate(obj_id)
 
     async def all(self) -> Sequence[T]:
         result = await self.session.execute(select(self.model))
         return result.scalars().all()
 
 
+@dataclass(frozen=True, slots=True)
+class WordSnapshot:
+    """Слово с примерами, не привязанное к сессии, и готовое HTML-сообщение для него."""
+
+    id: int
+    data: WordData
+    message: str
+
+    @classmethod
+    def from_word(cls, word: Word) -> 'WordSnapshot':
+        data = word.to_word_data()
+        return cls(id=word.id, data=data, message=data.create_message())
+
+
+class WordCache:
+    """
+    LRU-кэш снимков слов по `word_id` в памяти процесса (не больше `maxsize` записей).
+
+    Слова после создания почти не меняются, поэтому записи не устаревают по времени:
+    `WordManager` сбрасывает слово при каждой записи в него.
+    """
+
+    def __init__(self, maxsize: int, enabled: bool = True) -> None:
+        self.maxsize = maxsize
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[int, WordSnapshot] = OrderedDict()
+
+    def get(self, word_id: int) -> WordSnapshot | None:
+        snapshot = self._data.get(word_id)
+        if snapshot is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._data.move_to_end(word_id)
+        return snapshot
+
+    def set(self, snapshot: WordSnapshot) -> None:
+        if not self.enabled:
+            return
+        self._data[snapshot.id] = snapshot
+        self._data.move_to_end(snapshot.id)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, word_id: int | None) -> None:
+        if word_id is not None:
+            self._data.pop(word_id, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def describe(self) -> str:
+        return f'Word cache: {len(self._data)} of {self.maxsize} words, hits {self.hits}, misses {self.misses}'
+
+
+word_cache = WordCache(maxsize=WORD_CACHE_SIZE, enabled=WORD_CACHE_ENABLED)
+
+
 class WordManager(Manager[Word]):
+    # Вызываются после сохранения нового слова (индексы, кэши и т.п.).
+    created_hooks: ClassVar[list[Callable[[Word], None]]] = []
+
     def __init__(self, session: AsyncSession) -> None:
         super().__init__(session, Word)
 
+    def run_created_hooks(self, word: Word) -> None:
+        for hook in self.created_hooks:
+            try:
+                hook(word)
+            except Exception as e:
+                logger.error('Error in word created hook %s: %s', hook, e)
+
     async def get_by_word(self, word: str) -> Optional[Word]:
         result = await self.session.execute(select(self.model).where(func.lower(self.model.word) == word.lower()))
         return result.scalar_one_or_none()
@@ -66,14 +157,98 @@ class WordManager(Manager[Word]):
         self.session.add(word_progress)
         await self.session.commit()
         await self.session.refresh(word)
+        self.run_created_hooks(word)
         return word
 
+    def _insert_ignore_duplicates(self):
+        dialect = self.session.get_bind().dialect.name
+        if dialect == 'postgresql':
+            return postgresql_insert(self.model).on_conflict_do_nothing(index_elements=[self.model.word])
+        if dialect == 'sqlite':
+            return sqlite_insert(self.model).on_conflict_do_nothing(index_elements=[self.model.word])
+        raise NotImplementedError(f'Bulk word insert is not supported for dialect: {dialect}')
+
+    async def bulk_create_from_data(self, words_data: Sequence[WordData]) -> list[Word]:
+        """
+        Сохраняет все слова одного ответа, их примеры и прогресс одной транзакцией.
+
+        Дубликаты внутри пачки и уже существующие слова (без учёта регистра) пропускаются.
+        Возвращает только созданные слова (без примеров).
+        """
+        unique: dict[str, WordData] = {}
+        for data in words_data:
+            if data.word and data.word.lower() not in unique:
+                unique[data.word.lower()] = data
+        if not unique:
+            return []
+        existing = await self.session.execute(
+            select(func.lower(self.model.word)).where(func.lower(self.model.word).in_(unique.keys()))
+        )
+        for (word,) in existing.all():
+            unique.pop(word, None)
+        if not unique:
+            return []
+        rows = {
+            key: {
+                'word': data.word,
+                'transcription': data.transcription,
+                'translation': data.translation,
+                'part_of_speech': data.part_of_speech,
+                'forms': data.forms,
+                'explanation': data.explanation,
+            }
+            for key, data in unique.items()
+        }
+        # ON CONFLICT DO NOTHING защищает от слов, вставленных параллельно между SELECT и INSERT.
+        result = await self.session.execute(
+            self._insert_ignore_duplicates().values(list(rows.values())).returning(self.model.id, self.model.word)
+        )
+        # Объекты собираются из вставленных строк целиком: хуки (например, индекс словаря) используют и `forms`.
+        created = [self.model(id=word_id, **rows[word.lower()]) for word_id, word in result.all()]
+        if not created:
+            await self.session.rollback()
+            return []
+        examples = [
+            {'word_id': word.id, 'example': example.example, 'translation': example.translation}
+            for word in created
+            for example in unique[word.word.lower()].examples or []  # type: ignore[union-attr]
+        ]
+        if examples:
+            await self.session.execute(insert(Example), examples)
+        await self.session.execute(
+            insert(WordProgress),
+            [{'word_id': word.id, 'repetitions': 0, 'next_review_at': default_next_review()} for word in created],
+        )
+        await self.session.commit()
+        for word in created:
+            self.run_created_hooks(word)
+        return created
+
+    def invalidate(self, obj_id: int | None) -> None:
+        word_cache.invalidate(obj_id)
+
+    async def set_voice_file_id(self, word_id: int, file_id: str | None) -> None:
+        await self.session.execute(update(self.model).where(self.model.id == word_id).values(voice_file_id=file_id))
+        await self.session.commit()
+        self.invalidate(word_id)
+
     async def get_with_examples(self, word_id: int) -> Optional[Word]:
         result = await self.session.execute(
             select(self.model).where(self.model.id == word_id).options(selectinload(self.model.examples))
         )
         return result.scalar_one_or_none()
 
+    async def get_snapshot(self, word_id: int) -> Optional[WordSnapshot]:
+        """Снимок слова из `word_cache`, а при промахе — из БД (с примерами) с сохранением в кэш."""
+        snapshot = word_cache.get(word_id)
+        if snapshot is None:
+            word = await self.get_with_examples(word_id)
+            if word is None:
+                return None
+            snapshot = WordSnapshot.from_word(word)
+            word_cache.set(snapshot)
+        return snapshot
+
     async def get_all_with_examples(self) -> Sequence[Word]:
         result = await self.session.execute(select(self.model).options(selectinload(self.model.examples)))
         return result.scalars().all()
@@ -94,7 +269,13 @@ class PromptManager(Manager[Prompt]):
             return existing
         new_prompt = self.model(name=name, text=prompt_text)
         self.session.add(new_prompt)
-        await self.session.commit()
+        try:
+            await self.session.commit()
+        except IntegrityError:
+            # Промпт успел создать параллельный запрос.
+            await self.session.rollback()
+            result = await self.session.execute(select(self.model).where(self.model.name == name))
+            return result.scalar_one()
         return new_prompt
 
     async def update_text_by_name(self, name: str, new_text: str) -> None:
@@ -102,6 +283,8 @@ class PromptManager(Manager[Prompt]):
         prompt = result.scalar_one_or_none()
         if prompt:
             prompt.text = new_text
+            # Закэшированные ответы получены со старым промптом.
+            await self.session.execute(delete(CachedTranslation))
             await self.session.commit()
 
 
@@ -109,7 +292,7 @@ class WordProgressManager(Manager[WordProgress]):
     def __init__(self, session: AsyncSession) -> None:
         super().__init__(session, WordProgress)
 
-    async def get_next_review_words(self, limit: int = 10) -> Sequence[WordProgress]:
+    async def get_next_review_words(self, limit: int = REVIEW_BATCH_SIZE) -> Sequence[WordProgress]:
         now = datetime.now(tz=UTC)
         results = await self.session.execute(
             select(self.model)
@@ -126,10 +309,171 @@ class WordProgressManager(Manager[WordProgress]):
         )
         return result.scalar_one_or_none()
 
-    async def record_review(self, progress_id: int, success: bool) -> Optional[WordProgress]:
-        wp = await self.get_with_word(progress_id)
+    async def record_review(self, word_id: int, success: bool) -> Optional[WordProgress]:
+        """
+        Записывает ответ одним `UPDATE ... RETURNING` без предварительного чтения прогресса:
+        новое число повторений и дата следующего повторения вычисляются в самом запросе.
+        Событие добавляется в `review_events` в той же транзакции.
+        """
+        now = datetime.now(tz=UTC)
+        repetitions: ColumnElement[int]
+        if success:
+            repetitions = case(
+                (self.model.repetitions < len(REPETITION_INTERVALS), self.model.repetitions + 1),
+                else_=self.model.repetitions,
+            )
+        else:
+            repetitions = literal(1)
+        review_dates = {
+            level: literal(now + interval, DateTime(timezone=True)) for level, interval in REPETITION_INTERVALS.items()
+        }
+        next_review_at = case(review_dates, value=repetitions, else_=review_dates[max(review_dates)])
+        result = await self.session.execute(
+            update(self.model)
+            .where(self.model.word_id == word_id)
+            .values(repetitions=repetitions, last_reviewed_at=now, next_review_at=next_review_at)
+            .returning(self.model)
+            # Объект из identity map сессии обновляется значениями из RETURNING, а не остаётся прежним.
+            .execution_options(synchronize_session=False, populate_existing=True),
+        )
+        wp = result.scalar_one_or_none()
         if wp:
-            wp.record_review(success)
-            await self.session.commit()
-            await self.session.refresh(wp)
+            self.session.add(ReviewEvent(word_progress_id=wp.id, success=success, reviewed_at=now))
+        await self.session.commit()
         return wp
+
+
+class CachedTranslationManager(Manager[CachedTranslation]):
+    def __init__(self, session: AsyncSession) -> None:
+        super().__init__(session, CachedTranslation)
+
+    async def get_by_key(self, key: str, ttl: timedelta | None = None) -> Optional[CachedTranslation]:
+        query = select(self.model).where(self.model.key == key)
+        if ttl is not None:
+            query = query.where(self.model.created_at >= datetime.now(tz=UTC) - ttl)
+        result = await self.session.execute(query)
+        return result.scalar_one_or_none()
+
+    async def set(self, key: str, prompt_hash: str, message: str, words: list[dict]) -> None:
+        await self.session.execute(delete(self.model).where(self.model.key == key))
+        self.session.add(self.model(key=key, prompt_hash=prompt_hash, message=message, words=words))
+        await self.session.commit()
+
+    async def delete_expired(self, ttl: timedelta) -> None:
+        await self.session.execute(delete(self.model).where(self.model.created_at < datetime.now(tz=UTC) - ttl))
+        await self.session.commit()
+
+
+class TranslationJobManager(Manager[TranslationJob]):
+    def __init__(self, session: AsyncSession) -> None:
+        super().__init__(session, TranslationJob)
+
+    async def create(self, chat_id: int, text: str, save_to_db: bool, message_id: int | None = None) -> TranslationJob:
+        job = self.model(chat_id=chat_id, message_id=message_id, text=text, save_to_db=save_to_db)
+        await self.save(job)
+        return job
+
+    async def claim_next(self) -> Optional[TranslationJob]:
+        """Берёт самую старую готовую к обработке задачу и переводит её в `processing`."""
+        now = datetime.now(tz=UTC)
+        result = await self.session.execute(
+            select(self.model.id)
+            .where(self.model.status == TranslationJob.PENDING, self.model.next_attempt_at <= now)
+            .order_by(self.model.id)
+            .limit(5)
+        )
+        for job_id in result.scalars().all():
+            # Условный UPDATE: задачу мог забрать другой воркер.
+            claimed = await self.session.execute(
+                update(self.model)
+                .where(self.model.id == job_id, self.model.status == TranslationJob.PENDING)
+                .values(status=TranslationJob.PROCESSING, attempts=self.model.attempts + 1)
+            )
+            await self.session.commit()
+            if claimed.rowcount:
+                return await self.get(job_id)
+        return None
+
+    async def _set_status(self, job_id: int, status: str, error: str | None = None, delay: float = 0) -> None:
+        await self.session.execute(
+            update(self.model)
+            .where(self.model.id == job_id)
+            .values(
+                status=status,
+                last_error=error,
+                next_attempt_at=datetime.now(tz=UTC) + timedelta(seconds=delay),
+            )
+        )
+        await self.session.commit()
+
+    async def mark_done(self, job_id: int) -> None:
+        await self._set_status(job_id, TranslationJob.DONE)
+
+    async def mark_failed(self, job_id: int, error: str) -> None:
+        await self._set_status(job_id, TranslationJob.FAILED, error)
+
+    async def retry_later(self, job_id: int, error: str, delay: float) -> None:
+        await self._set_status(job_id, TranslationJob.PENDING, error, delay)
+
+    async def requeue_processing(self) -> int:
+        """Возвращает в очередь задачи, оборванные остановкой процесса."""
+        result = await self.session.execute(
+            update(self.model)
+            .where(self.model.status == TranslationJob.PROCESSING)
+            .values(status=TranslationJob.PENDING)
+        )
+        await self.session.commit()
+        return result.rowcount
+
+    async def count_by_status(self) -> dict[str, int]:
+        result = await self.session.execute(select(self.model.status, func.count()).group_by(self.model.status))
+        return {status: count for status, count in result.all()}
+
+
+class FSMRecordManager(Manager[FSMRecord]):
+    def __init__(self, session: AsyncSession) -> None:
+        super().__init__(session, FSMRecord)
+
+    async def get_by_key(self, key: str, ttl: timedelta | None = None) -> Optional[FSMRecord]:
+        query = select(self.model).where(self.model.key == key)
+        if ttl is not None:
+            query = query.where(self.model.updated_at >= datetime.now(tz=UTC) - ttl)
+        result = await self.session.execute(query)
+        return result.scalar_one_or_none()
+
+    def _upsert(self, key: str, values: dict):
+        dialect = self.session.get_bind().dialect.name
+        if dialect == 'postgresql':
+            return (
+                postgresql_insert(self.model)
+                .values(key=key, **values)
+                .on_conflict_do_update(index_elements=[self.model.key], set_=values)
+            )
+        if dialect == 'sqlite':
+            return (
+                sqlite_insert(self.model)
+                .values(key=key, **values)
+                .on_conflict_do_update(index_elements=[self.model.key], set_=values)
+            )
+        raise NotImplementedError(f'FSM state upsert is not supported for dialect: {dialect}')
+
+    async def upsert(self, key: str, state: str | None, data: dict) -> None:
+        values = {'state': state, 'data': data, 'updated_at': datetime.now(tz=UTC)}
+        await self.session.execute(self._upsert(key, values))
+        await self.session.commit()
+
+    async def delete_by_key(self, key: str) -> None:
+        await self.session.execute(delete(self.model).where(self.model.key == key))
+        await self.session.commit()
+
+    async def delete_expired(self, ttl: timedelta, batch_size: int) -> int:
+        """Удаляет устаревшие состояния пачками по `batch_size`, чтобы не держать долгую блокировку таблицы."""
+        cutoff = datetime.now(tz=UTC) - ttl
+        deleted = 0
+        while True:
+            keys = select(self.model.key).where(self.model.updated_at < cutoff).limit(batch_size).scalar_subquery()
+            result = await self.session.execute(delete(self.model).where(self.model.key.in_(keys)))
+            await self.session.commit()
+            deleted += result.rowcount
+            if result.rowcount < batch_size:
+                return deleted
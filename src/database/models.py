@@ -1,9 +1,20 @@
 from datetime import datetime
 from typing import List, Optional
 
-from sqlalchemy import JSON, DateTime, ForeignKey, String, Text, UniqueConstraint
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    Boolean,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+    func,
+)
 from sqlalchemy.ext.asyncio import AsyncAttrs
-from sqlalchemy.ext.mutable import MutableList
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 from constants import REPETITION_INTERVALS, UTC
@@ -14,6 +25,10 @@ def default_next_review():
     return datetime.now(tz=UTC) + REPETITION_INTERVALS[0]
 
 
+def utc_now():
+    return datetime.now(tz=UTC)
+
+
 class Base(AsyncAttrs, DeclarativeBase):
     pass
 
@@ -38,9 +53,13 @@ class Word(Base):
     part_of_speech: Mapped[Optional[str]] = mapped_column(String(100))
     forms: Mapped[Optional[str]] = mapped_column(Text)
     explanation: Mapped[Optional[str]] = mapped_column(Text)
+    voice_file_id: Mapped[Optional[str]] = mapped_column(String(255))
 
     examples: Mapped[List['Example']] = relationship(back_populates='word', cascade='all, delete-orphan')
 
+    # Поиск слова без учёта регистра (`func.lower(Word.word)`) не может использовать уникальный индекс по `word`.
+    __table_args__ = (Index('ix_words_word_lower', func.lower(word)),)
+
     def to_word_data(self) -> WordData:
         return WordData(
             word=self.word,
@@ -67,7 +86,7 @@ class Example(Base):
     example: Mapped[Optional[str]] = mapped_column(Text)
     translation: Mapped[Optional[str]] = mapped_column(Text)
 
-    word_id: Mapped[int] = mapped_column(ForeignKey('words.id', ondelete='CASCADE'))
+    word_id: Mapped[int] = mapped_column(ForeignKey('words.id', ondelete='CASCADE'), index=True)
     word: Mapped['Word'] = relationship(back_populates='examples')
 
 
@@ -75,22 +94,22 @@ class WordProgress(Base):
     __tablename__ = 'word_progress'
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    word_id: Mapped[int] = mapped_column(ForeignKey('words.id', ondelete='CASCADE'))
-    review_history: Mapped[list[str]] = mapped_column(
-        MutableList.as_mutable(JSON),
-        default=list,
-        nullable=False,
-    )
+    word_id: Mapped[int] = mapped_column(ForeignKey('words.id', ondelete='CASCADE'), index=True)
+    # Число успешных повторений подряд (после ошибки — 1), не больше len(REPETITION_INTERVALS).
+    repetitions: Mapped[int] = mapped_column(Integer, default=0, server_default='0')
+    last_reviewed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
     next_review_at: Mapped[Optional[datetime]] = mapped_column(
         DateTime(timezone=True),
         default=default_next_review,
+        index=True,
     )
 
     word: Mapped['Word'] = relationship()
 
     @property
-    def repetitions(self) -> int:
-        return min(len(self.review_history), max(REPETITION_INTERVALS.keys()))
+    def level(self) -> int:
+        """Ключ REPETITION_INTERVALS для текущего числа повторений."""
+        return min(self.repetitions, max(REPETITION_INTERVALS.keys()))
 
     @property
     def next_review(self) -> datetime:
@@ -99,18 +118,60 @@ class WordProgress(Base):
         return self.count_next_review()
 
     def count_next_review(self, from_time: Optional[datetime] = None) -> datetime:
-        interval = REPETITION_INTERVALS[self.repetitions]
+        interval = REPETITION_INTERVALS[self.level]
         if from_time is None:
             from_time = datetime.now(tz=UTC)
         return from_time + interval
 
-    def record_review(self, success: bool) -> None:
-        now = datetime.now(tz=UTC)
-        now_iso = now.isoformat()
-        if success:
-            if len(self.review_history) < len(REPETITION_INTERVALS):
-                self.review_history.append(now_iso)
-        else:
-            self.review_history.clear()
-            self.review_history.append(now_iso)
-        self.next_review_at = self.count_next_review(from_time=now)
+
+class ReviewEvent(Base):
+    """Журнал ответов на повторения (только добавление)."""
+
+    __tablename__ = 'review_events'
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    word_progress_id: Mapped[int] = mapped_column(ForeignKey('word_progress.id', ondelete='CASCADE'), index=True)
+    # None — исход неизвестен: первая запись, перенесённая из старого review_history.
+    success: Mapped[Optional[bool]] = mapped_column(Boolean)
+    reviewed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utc_now)
+
+
+class CachedTranslation(Base):
+    __tablename__ = 'translation_cache'
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    key: Mapped[str] = mapped_column(String(64), unique=True)
+    prompt_hash: Mapped[str] = mapped_column(String(64), index=True)
+    message: Mapped[Optional[str]] = mapped_column(Text)
+    words: Mapped[list[dict]] = mapped_column(JSON, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utc_now)
+
+
+class TranslationJob(Base):
+    __tablename__ = 'translation_jobs'
+
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (PENDING, PROCESSING, DONE, FAILED)
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    chat_id: Mapped[int] = mapped_column(BigInteger)
+    message_id: Mapped[Optional[int]] = mapped_column(BigInteger)
+    text: Mapped[str] = mapped_column(Text)
+    save_to_db: Mapped[bool] = mapped_column(Boolean, default=False)
+    status: Mapped[str] = mapped_column(String(20), default=PENDING, index=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    last_error: Mapped[Optional[str]] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utc_now)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utc_now)
+
+
+class FSMRecord(Base):
+    __tablename__ = 'fsm_states'
+
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    state: Mapped[Optional[str]] = mapped_column(String(255))
+    data: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utc_now, index=True)
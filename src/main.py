@@ -7,30 +7,52 @@ from aiogram.types import CallbackQuery, Message
 
 from dotenv import load_dotenv
 
-from constants import ALLOWED_CHATS_FOR_SAVING_TO_DB, JSON_FORMAT, PromptName
-from core.gemini import GeminiEnglight
+from constants import (
+    ALLOWED_CHATS_FOR_SAVING_TO_DB,
+    GEMINI_STREAMING,
+    IS_PRIMARY_WORKER,
+    JOB_QUEUE_ENABLED,
+    JSON_FORMAT,
+    WEBHOOK_ENABLED,
+    WORKER_INDEX,
+    WORKERS,
+    PromptName,
+)
+from core.cache import translation_cache
+from core.dictionary import headword_index
+from core.gemini import GeminiEnglight, gemini_batcher, gemini_flight, hedge_stats
+from core.gemini_client import gemini_client
+from core.jobs import job_queue
 from core.loggers import setup_logging
+from core.retry import gemini_retry_policy, telegram_retry_policy, telegram_send_retry_policy
+from core.router import model_router
 from core.scheduler import setup_scheduler
+from core.tts_cache import audio_cache
+from core.write_behind import word_writer
 from database.database import db
-from database.managers import PromptManager, WordManager, WordProgressManager
+from database.managers import PromptManager, WordManager, WordProgressManager, word_cache
 from telegram.bot import bot, dp, router
 from telegram.buttons import make_sure_buttons
 from telegram.filters import access_filter
+from telegram.middlewares.admission import AdmissionClass, admission
+from telegram.sender import sender
 from telegram.states import PromptStates
+from telegram.supervisor import run_supervisor
+from telegram.webhook import run_webhook
 
 
 @router.message(CommandStart(), access_filter)
 async def command_start_handler(message: Message) -> None:
     if not message.from_user:
         return
-    await message.answer(f'Hello, {message.from_user.full_name}!')
+    await sender.answer(message, f'Hello, {message.from_user.full_name}!')
 
 
 @router.message(Command('update_translate_prompt'), access_filter)
 async def update_translate_prompt_handler(message: Message, state: FSMContext) -> None:
     if not message.from_user:
         return
-    await message.answer('Input new translate prompt text:')
+    await sender.answer(message, 'Input new translate prompt text:')
     await state.set_state(PromptStates.waiting_for_translate_prompt)
 
 
@@ -41,7 +63,39 @@ async def count_words_handler(message: Message) -> None:
     async with db.async_session() as session:
         words = await WordManager(session).all()
         response = f'Total words in the database: {len(words)}'
-        await message.answer(response)
+        await sender.answer(message, response)
+
+
+@router.message(Command('model_stats'), access_filter)
+async def model_stats_handler(message: Message) -> None:
+    if not message.from_user:
+        return
+    response = model_router.describe() or 'No models configured.'
+    response += (
+        f'\n\nHedged requests: {hedge_stats.fired}, won by hedge: {hedge_stats.won}, skipped: {hedge_stats.skipped}'
+    )
+    response += f'\n{gemini_retry_policy.describe()}\n{telegram_retry_policy.describe()}'
+    response += f'\n{telegram_send_retry_policy.describe()}'
+    response += f'\n\nAdmission pools:\n{admission.describe()}'
+    await sender.answer(message, response, parse_mode=ParseMode.HTML)
+
+
+@router.message(Command('cache_stats'), access_filter)
+async def cache_stats_handler(message: Message) -> None:
+    if not message.from_user:
+        return
+    await sender.answer(
+        message,
+        f'{translation_cache.describe()}\n'
+        f'Local dictionary hits: {headword_index.hits}\n'
+        f'{gemini_flight.describe()}\n'
+        f'{gemini_batcher.describe()}\n'
+        f'{word_writer.describe()}\n'
+        f'{word_cache.describe()}\n'
+        f'{audio_cache.describe()}\n'
+        f'{sender.describe()}\n'
+        f'{await job_queue.describe()}',
+    )
 
 
 @router.message(PromptStates.waiting_for_translate_prompt, access_filter)
@@ -50,30 +104,49 @@ async def waiting_for_translate_prompt_handler(message: Message, state: FSMConte
         return
     new_text = message.text
     if not new_text:
-        await message.answer('Prompt text cannot be empty.')
+        await sender.answer(message, 'Prompt text cannot be empty.')
         return
     if '{message}' not in new_text:
-        await message.answer('Prompt text must contain "{message}" placeholder.')
+        await sender.answer(message, 'Prompt text must contain "{message}" placeholder.')
         return
     if JSON_FORMAT not in new_text:
-        await message.answer(f'Prompt text must contain:\n{JSON_FORMAT}')
+        await sender.answer(message, f'Prompt text must contain:\n{JSON_FORMAT}')
         return
     async with db.async_session() as session:
         prompt_manager = PromptManager(session)
         await prompt_manager.update_text_by_name(PromptName.TRANSLATE, new_text)
-        await message.answer('Translate prompt updated successfully.')
+        translation_cache.invalidate()
+        await sender.answer(message, 'Translate prompt updated successfully.')
         await state.clear()
 
 
-@router.message(StateFilter(None), access_filter)
+@router.message(StateFilter(None), access_filter, flags={'admission': AdmissionClass.LLM})
 async def handle_all_messages(message: Message) -> None:
     text = message.text
     if not text:
         return
     save_to_db = str(message.chat.id) in ALLOWED_CHATS_FOR_SAVING_TO_DB
+    if JOB_QUEUE_ENABLED:
+        await job_queue.enqueue(message.chat.id, text, save_to_db, message.message_id)
+        return
+    if GEMINI_STREAMING:
+        await stream_answers(message, GeminiEnglight(text, save_to_db))
+        return
     answers = await GeminiEnglight(text, save_to_db)()
     for answer in answers:
-        await message.answer(str(answer), parse_mode=ParseMode.HTML)
+        await sender.answer(message, str(answer), parse_mode=ParseMode.HTML)
+
+
+async def stream_answers(message: Message, englight: GeminiEnglight) -> None:
+    placeholder: Message | None = await sender.answer(message, 'Translating...')
+    async for answer in englight.stream():
+        if placeholder:
+            await sender.edit_text(placeholder, answer, parse_mode=ParseMode.HTML)
+            placeholder = None
+        else:
+            await sender.answer(message, answer, parse_mode=ParseMode.HTML)
+    if placeholder:
+        await sender.delete(placeholder)
 
 
 @router.callback_query(lambda c: c.data.startswith('know_') or c.data.startswith('not_know_'), access_filter)
@@ -84,13 +157,14 @@ async def handle_know_not_know(callback_query: CallbackQuery):
     word_id = int(data[-1])
     async with db.async_session() as session:
         word_manager = WordManager(session)
-        word = await word_manager.get_with_examples(word_id)
+        word = await word_manager.get_snapshot(word_id)
         if not word:
-            await callback_query.message.edit_text('Word not found.')  # type: ignore[union-attr]
+            await sender.edit_text(callback_query.message, 'Word not found.')
             return
         is_know = data[0] == 'know'
-        msg = f'{word.to_message()}\n\n <i>Do you really know this word?</i>' if is_know else word.to_message()
-        await callback_query.message.edit_text(  # type: ignore[union-attr]
+        msg = f'{word.message}\n\n <i>Do you really know this word?</i>' if is_know else word.message
+        await sender.edit_text(
+            callback_query.message,
             msg,
             parse_mode=ParseMode.HTML,
             reply_markup=make_sure_buttons(word_id, is_know=is_know),
@@ -107,13 +181,17 @@ async def handle_sure(callback_query: CallbackQuery) -> None:
         word_progress_manager = WordProgressManager(session)
         word_progress = await word_progress_manager.record_review(word_id, answer == 'yes')
         if not word_progress:
-            await callback_query.message.edit_text(  # type: ignore[union-attr]
+            await sender.edit_text(
+                callback_query.message,
                 'Word progress not found.',
                 reply_markup=None,
             )
             return
-        await callback_query.message.edit_text(  # type: ignore[union-attr]
-            f'I updated word "<b>{word_progress.word.word or 'WAS EMPTY'}"</b> progress. Thanks for your answer!',
+        word = await WordManager(session).get_snapshot(word_id)
+        word_text = word.data.word if word and word.data.word else 'WAS EMPTY'
+        await sender.edit_text(
+            callback_query.message,
+            f'I updated word "<b>{word_text}"</b> progress. Thanks for your answer!',
             reply_markup=None,
             parse_mode=ParseMode.HTML,
         )
@@ -121,11 +199,29 @@ async def handle_sure(callback_query: CallbackQuery) -> None:
 
 async def main() -> None:
     await db.init_models()
-    setup_scheduler()
-    await dp.start_polling(bot)
+    await headword_index.load()
+    gemini_client.open()
+    word_writer.start()
+    if JOB_QUEUE_ENABLED:
+        await job_queue.start(requeue=IS_PRIMARY_WORKER)
+    if IS_PRIMARY_WORKER:
+        setup_scheduler()
+    try:
+        if WEBHOOK_ENABLED:
+            await run_webhook(dp, bot)
+        else:
+            await bot.delete_webhook()
+            await dp.start_polling(bot)
+    finally:
+        await job_queue.stop()
+        await word_writer.stop()
+        await gemini_client.close()
 
 
 if __name__ == '__main__':
     load_dotenv()
     setup_logging()
-    asyncio.run(main())
+    if WORKERS > 1 and WORKER_INDEX is None:
+        asyncio.run(run_supervisor(bot))
+    else:
+        asyncio.run(main())
@@ -0,0 +1,44 @@
+"""
+Отправляет записанные обновления Telegram в локальный webhook-сервер, как это делает Telegram.
+
+Файл — JSON Lines, по одному объекту `Update` в строке. Секрет берётся из `WEBHOOK_SECRET`.
+
+Запуск: `python src/scripts/post_updates.py updates.jsonl [--url http://localhost:8080/webhook] [--delay 0.1]`
+"""
+
+import argparse
+import asyncio
+import json
+import os
+from pathlib import Path
+
+import httpx
+
+
+def read_updates(path: Path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines() if line.strip()]
+
+
+async def post_updates(url: str, secret: str, updates: list[dict], delay: float) -> None:
+    headers = {'X-Telegram-Bot-Api-Secret-Token': secret} if secret else {}
+    async with httpx.AsyncClient(timeout=30) as client:
+        for update in updates:
+            response = await client.post(url, json=update, headers=headers)
+            print(f'update {update.get("update_id")}: {response.status_code} {response.text[:200]}')
+            await asyncio.sleep(delay)
+
+
+def main() -> None:
+    port = os.getenv('WEBHOOK_PORT', '8080')
+    path = os.getenv('WEBHOOK_PATH', '/webhook')
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('file', type=Path, help='JSON Lines file with recorded updates')
+    parser.add_argument('--url', default=f'http://localhost:{port}{path}')
+    parser.add_argument('--secret', default=os.getenv('WEBHOOK_SECRET', ''))
+    parser.add_argument('--delay', type=float, default=0.0, help='pause between updates, seconds')
+    args = parser.parse_args()
+    asyncio.run(post_updates(args.url, args.secret, read_updates(args.file), args.delay))
+
+
+if __name__ == '__main__':
+    main()
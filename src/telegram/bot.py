@@ -1,10 +1,12 @@
 from os import getenv
 
 from aiogram import Bot, Dispatcher, Router
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.client.session.aiohttp import AiohttpSession
-from telegram.middlewares.retry_after import LimiterMiddleware
+
 from constants import PROXY_URL
+from telegram.middlewares.admission import admission
+from telegram.middlewares.retry_after import RetryRequestMiddleware
+from telegram.storage import storage
 
 TOKEN = getenv('BOT_TOKEN')
 
@@ -12,11 +14,12 @@ if not TOKEN:
     raise ValueError('BOT_TOKEN environment variable is not set.')
 
 session = AiohttpSession(proxy=PROXY_URL) if PROXY_URL else AiohttpSession()
+session.middleware(RetryRequestMiddleware())
 bot = Bot(token=TOKEN, session=session)
-storage = MemoryStorage()
 dp = Dispatcher(storage=storage)
 
 router = Router()
-router.message.middleware(LimiterMiddleware())
+router.message.middleware(admission)
+router.callback_query.middleware(admission)
 
 dp.include_router(router)
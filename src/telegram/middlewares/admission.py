@@ -0,0 +1,180 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from enum import StrEnum
+from typing import Any, Callable
+
+from aiogram.dispatcher.flags import get_flag
+from aiogram.dispatcher.middlewares.base import BaseMiddleware
+from aiogram.types import CallbackQuery, Message
+from aiogram.types.base import TelegramObject
+
+from constants import (
+    ADMISSION_CHEAP_CONCURRENCY,
+    ADMISSION_LLM_CONCURRENCY,
+    ADMISSION_MAX_CHAT_QUEUE,
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_WAIT_WINDOW,
+)
+from core.loggers import main_logger as logger
+
+OVERLOADED_MESSAGE = 'I am a bit overloaded right now. Please try again in a minute.'
+
+
+class AdmissionClass(StrEnum):
+    LLM = 'llm'
+    CHEAP = 'cheap'
+
+
+class AdmissionRejected(Exception):
+    pass
+
+
+class FairPool:
+    """
+    Пул из `capacity` одновременно выполняемых обработчиков с честной очередью по чатам.
+
+    Ожидающие хранятся в отдельной очереди для каждого чата, а освободившийся слот передаётся чатам
+    по кругу, поэтому один активный чат не может занять все слоты. Если общая очередь или очередь чата
+    переполнена, `acquire()` сразу отказывает с `AdmissionRejected`.
+    """
+
+    def __init__(self, name: str, capacity: int, max_queue: int, max_chat_queue: int, wait_window: int) -> None:
+        self.name = name
+        self.capacity = capacity
+        self.max_queue = max_queue
+        self.max_chat_queue = max_chat_queue
+        self.active = 0
+        self.waiting: OrderedDict[int, deque[asyncio.Future]] = OrderedDict()
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.waits: deque[float] = deque(maxlen=wait_window)
+
+    async def acquire(self, chat_id: int) -> None:
+        if self.active < self.capacity and not self.queued:
+            self.active += 1
+            self.admitted += 1
+            self.waits.append(0.0)
+            return
+        chat_queue = self.waiting.get(chat_id)
+        if self.queued >= self.max_queue or (chat_queue and len(chat_queue) >= self.max_chat_queue):
+            self.rejected += 1
+            raise AdmissionRejected(self.name)
+        future = asyncio.get_running_loop().create_future()
+        self.waiting.setdefault(chat_id, deque()).append(future)
+        self.queued += 1
+        started_at = time.monotonic()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Слот уже был передан этому ожидающему — возвращаем его следующему.
+                self.release()
+            else:
+                self._remove(chat_id, future)
+            raise
+        self.admitted += 1
+        self.waits.append(time.monotonic() - started_at)
+
+    def _remove(self, chat_id: int, future: asyncio.Future) -> None:
+        chat_queue = self.waiting.get(chat_id)
+        if chat_queue and future in chat_queue:
+            chat_queue.remove(future)
+            self.queued -= 1
+            if not chat_queue:
+                del self.waiting[chat_id]
+
+    def release(self) -> None:
+        while self.waiting:
+            chat_id, chat_queue = next(iter(self.waiting.items()))
+            future = chat_queue.popleft()
+            self.queued -= 1
+            if chat_queue:
+                self.waiting.move_to_end(chat_id)
+            else:
+                del self.waiting[chat_id]
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    def describe(self) -> str:
+        waits = sorted(self.waits)
+        if waits:
+            avg = sum(waits) / len(waits)
+            p95 = waits[min(len(waits) - 1, int(len(waits) * 0.95))]
+            wait_info = f'wait avg {avg * 1000:.0f} ms, p95 {p95 * 1000:.0f} ms, max {waits[-1] * 1000:.0f} ms'
+        else:
+            wait_info = 'no waits yet'
+        return (
+            f'{self.name}: active {self.active}/{self.capacity}, queued {self.queued}, '
+            f'admitted {self.admitted}, rejected {self.rejected}, {wait_info}'
+        )
+
+
+def get_chat_id(event: TelegramObject) -> int | None:
+    if isinstance(event, Message):
+        return event.chat.id
+    if isinstance(event, CallbackQuery) and event.message:
+        return event.message.chat.id
+    return None
+
+
+class AdmissionMiddleware(BaseMiddleware):
+    """
+    Допуск входящих событий к обработчикам с раздельными пулами для дорогих (запрос к Gemini)
+    и дешёвых обработчиков. Класс обработчика задаётся флагом `admission`, по умолчанию — дешёвый.
+    При переполнении очереди пользователь получает вежливый отказ вместо долгого ожидания.
+    """
+
+    def __init__(self, pools: dict[AdmissionClass, FairPool]) -> None:
+        self.pools = pools
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict], Any],
+        event: TelegramObject,
+        data: dict,
+    ) -> Any:
+        chat_id = get_chat_id(event)
+        if chat_id is None:
+            return await handler(event, data)
+        pool = self.pools[get_flag(data, 'admission', default=AdmissionClass.CHEAP)]
+        try:
+            await pool.acquire(chat_id)
+        except AdmissionRejected:
+            logger.warning('Admission pool "%s" is full, rejecting event from chat %s', pool.name, chat_id)
+            await self.reject(event)
+            return None
+        try:
+            return await handler(event, data)
+        finally:
+            pool.release()
+
+    async def reject(self, event: TelegramObject) -> None:
+        try:
+            if isinstance(event, (Message, CallbackQuery)):
+                await event.answer(OVERLOADED_MESSAGE)
+        except Exception as e:
+            logger.error('Error sending overload reply: %s', e)
+
+    def describe(self) -> str:
+        return '\n'.join(pool.describe() for pool in self.pools.values())
+
+
+admission = AdmissionMiddleware(
+    pools={
+        admission_class: FairPool(
+            name=admission_class,
+            capacity=capacity,
+            max_queue=ADMISSION_MAX_QUEUE,
+            max_chat_queue=ADMISSION_MAX_CHAT_QUEUE,
+            wait_window=ADMISSION_WAIT_WINDOW,
+        )
+        for admission_class, capacity in (
+            (AdmissionClass.LLM, ADMISSION_LLM_CONCURRENCY),
+            (AdmissionClass.CHEAP, ADMISSION_CHEAP_CONCURRENCY),
+        )
+    }
+)
@@ -1,19 +1,37 @@
-from typing import Any, Callable
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
 
-from aiogram.dispatcher.middlewares.base import BaseMiddleware
-from aiogram.types.base import TelegramObject
+from core.retry import RetryPolicy, telegram_retry_policy, telegram_send_retry_policy
 
-from aiolimiter import AsyncLimiter
+# Повтор этих методов после сетевой ошибки или 5xx не создаёт дубликатов (повторное чтение или та же запись).
+IDEMPOTENT_METHOD_PREFIXES = ('get', 'set', 'delete', 'edit', 'answerCallbackQuery')
 
-limiter = AsyncLimiter(20, 1)
 
+class RetryRequestMiddleware(BaseRequestMiddleware):
+    """
+    Повторяет исходящие запросы к Telegram Bot API по политике повторов.
+
+    Это единственный слой, который обрабатывает `RetryAfter`: он повторяется для всех методов.
+    Сетевые ошибки и 5xx повторяются только для идемпотентных методов, иначе, например, `sendMessage`
+    мог бы отправить сообщение дважды.
+    """
+
+    def __init__(
+        self,
+        policy: RetryPolicy = telegram_retry_policy,
+        send_policy: RetryPolicy = telegram_send_retry_policy,
+    ) -> None:
+        self.policy = policy
+        self.send_policy = send_policy
 
-class LimiterMiddleware(BaseMiddleware):
     async def __call__(
         self,
-        handler: Callable[[TelegramObject, dict], Any],
-        event: TelegramObject,
-        data: dict,
-    ) -> Any:
-        async with limiter:
-            return await handler(event, data)
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        idempotent = method.__api_method__.startswith(IDEMPOTENT_METHOD_PREFIXES)
+        policy = self.policy if idempotent else self.send_policy
+        return await policy.run(make_request, bot, method)
@@ -0,0 +1,189 @@
+import asyncio
+import itertools
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Awaitable, Callable
+
+from aiogram.types import InaccessibleMessage, Message
+
+from aiolimiter import AsyncLimiter
+
+from constants import (
+    TELEGRAM_CHAT_BURST,
+    TELEGRAM_CHAT_RATE,
+    TELEGRAM_GLOBAL_RATE,
+    TELEGRAM_GROUP_RATE_PER_MINUTE,
+    TELEGRAM_SCHEDULED_SHARE,
+    WORKER_INDEX,
+    WORKERS,
+)
+from telegram.bot import bot
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    SCHEDULED = 1
+
+
+@dataclass(order=True)
+class SendJob:
+    priority: int
+    seq: int
+    func: Callable[[], Awaitable[Any]] = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+@dataclass
+class SenderStats:
+    sent: int = 0
+    failed: int = 0
+
+
+class OutboundSender:
+    """
+    Очередь исходящих запросов к Telegram с глобальным и поканальным ограничением скорости.
+
+    У каждого чата своя очередь с приоритетами и свой лимит (личные чаты — около 1 сообщения в секунду,
+    группы — `group_rate_per_minute` в минуту); порядок отправки внутри чата сохраняется.
+    Все чаты делят глобальный лимит, а плановые отправки (повторения слов) получают только его долю
+    `scheduled_share`, чтобы не вытеснять ответы пользователям. `RetryAfter` повторяет `RetryRequestMiddleware`,
+    пока он ждёт, очередь чата стоит.
+    """
+
+    def __init__(
+        self,
+        global_rate: float,
+        chat_rate: float,
+        chat_burst: int,
+        group_rate_per_minute: float,
+        scheduled_share: float,
+    ) -> None:
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate_per_minute = group_rate_per_minute
+        self.global_limiter = AsyncLimiter(global_rate, 1)
+        self.scheduled_limiter = AsyncLimiter(max(global_rate * scheduled_share, 1), 1)
+        self.queues: dict[int, asyncio.PriorityQueue[SendJob]] = {}
+        # Лимитеры живут дольше очередей: иначе каждая новая очередь чата получала бы полный запас отправок.
+        # Порядок — по последнему использованию, значение — (лимитер, время последнего использования).
+        self.chat_limiters: OrderedDict[int, tuple[AsyncLimiter, float]] = OrderedDict()
+        self.workers: dict[int, asyncio.Task] = {}
+        self.stats = SenderStats()
+        self._seq = itertools.count()
+
+    def _chat_limiter(self, chat_id: int) -> AsyncLimiter:
+        self._prune_limiters()
+        item = self.chat_limiters.get(chat_id)
+        if item is None:
+            if chat_id < 0:
+                limiter = AsyncLimiter(self.group_rate_per_minute, 60)
+            else:
+                limiter = AsyncLimiter(self.chat_burst, self.chat_burst / self.chat_rate)
+        else:
+            limiter, _ = item
+        self._touch_limiter(chat_id, limiter)
+        return limiter
+
+    def _touch_limiter(self, chat_id: int, limiter: AsyncLimiter) -> None:
+        self.chat_limiters[chat_id] = (limiter, time.monotonic())
+        self.chat_limiters.move_to_end(chat_id)
+
+    def _prune_limiters(self) -> None:
+        """Удаляет лимитеры чатов без отправок дольше периода восполнения: они уже снова полны."""
+        now = time.monotonic()
+        while self.chat_limiters:
+            chat_id, (limiter, used_at) = next(iter(self.chat_limiters.items()))
+            if now - used_at <= limiter.time_period or chat_id in self.workers:
+                break
+            del self.chat_limiters[chat_id]
+
+    @property
+    def depth(self) -> int:
+        return sum(queue.qsize() for queue in self.queues.values())
+
+    async def send(
+        self,
+        chat_id: int | str,
+        func: Callable[[], Awaitable[Any]],
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> Any:
+        chat_id = int(chat_id)
+        future = asyncio.get_running_loop().create_future()
+        queue = self.queues.setdefault(chat_id, asyncio.PriorityQueue())
+        queue.put_nowait(SendJob(priority, next(self._seq), func, future))
+        if chat_id not in self.workers:
+            self.workers[chat_id] = asyncio.create_task(self._chat_worker(chat_id, queue))
+        return await future
+
+    async def _chat_worker(self, chat_id: int, queue: asyncio.PriorityQueue[SendJob]) -> None:
+        limiter = self._chat_limiter(chat_id)
+        try:
+            while not queue.empty():
+                job = queue.get_nowait()
+                if job.future.done():
+                    continue
+                try:
+                    await limiter.acquire()
+                    self._touch_limiter(chat_id, limiter)
+                    if job.priority == Priority.SCHEDULED:
+                        await self.scheduled_limiter.acquire()
+                    await self.global_limiter.acquire()
+                    result = await job.func()
+                except Exception as e:
+                    self.stats.failed += 1
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                    continue
+                self.stats.sent += 1
+                if not job.future.done():
+                    job.future.set_result(result)
+        finally:
+            self.workers.pop(chat_id, None)
+            if queue.empty():
+                self.queues.pop(chat_id, None)
+
+    async def answer(
+        self, message: Message, text: str, priority: Priority = Priority.INTERACTIVE, **kwargs: Any
+    ) -> Message:
+        return await self.send(message.chat.id, lambda: message.answer(text, **kwargs), priority)
+
+    async def edit_text(
+        self,
+        message: Message | InaccessibleMessage,
+        text: str,
+        priority: Priority = Priority.INTERACTIVE,
+        **kwargs: Any,
+    ) -> Any:
+        edit_text = message.edit_text  # type: ignore[union-attr]
+        return await self.send(message.chat.id, lambda: edit_text(text, **kwargs), priority)
+
+    async def delete(self, message: Message, priority: Priority = Priority.INTERACTIVE) -> Any:
+        return await self.send(message.chat.id, message.delete, priority)
+
+    async def send_message(
+        self, chat_id: int | str, text: str, priority: Priority = Priority.INTERACTIVE, **kwargs: Any
+    ) -> Message:
+        return await self.send(chat_id, lambda: bot.send_message(chat_id=chat_id, text=text, **kwargs), priority)
+
+    async def send_voice(
+        self, chat_id: int | str, voice: Any, priority: Priority = Priority.INTERACTIVE, **kwargs: Any
+    ) -> Message:
+        return await self.send(chat_id, lambda: bot.send_voice(chat_id=chat_id, voice=voice, **kwargs), priority)
+
+    def describe(self) -> str:
+        return (
+            f'Outbound queue: depth {self.depth}, active chats {len(self.workers)}, sent {self.stats.sent}, '
+            f'failed {self.stats.failed}'
+        )
+
+
+sender = OutboundSender(
+    # Воркеры делят общий лимит бота поровну; поканальные лимиты не делятся, так как чат обслуживает один воркер.
+    global_rate=TELEGRAM_GLOBAL_RATE / WORKERS if WORKER_INDEX is not None else TELEGRAM_GLOBAL_RATE,
+    chat_rate=TELEGRAM_CHAT_RATE,
+    chat_burst=TELEGRAM_CHAT_BURST,
+    group_rate_per_minute=TELEGRAM_GROUP_RATE_PER_MINUTE,
+    scheduled_share=TELEGRAM_SCHEDULED_SHARE,
+)
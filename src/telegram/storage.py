@@ -0,0 +1,97 @@
+import copy
+from datetime import timedelta
+from typing import Any
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+
+from constants import FSM_CACHE_SIZE, FSM_CACHE_TTL, FSM_CHAT_AFFINITY, FSM_STATE_TTL, FSM_SWEEP_BATCH_SIZE
+from core.cache import TTLCache
+from core.loggers import main_logger as logger
+from database.database import db
+from database.managers import FSMRecordManager
+
+
+class DatabaseStorage(BaseStorage):
+    """
+    Хранилище FSM aiogram в таблице `fsm_states`, общее для всех процессов бота.
+
+    Прочитанные и записанные состояния кэшируются в памяти процесса, включая отсутствие состояния:
+    иначе каждое сообщение с `StateFilter(None)` обращалось бы к БД. Кэш включён только при `chat_affinity`
+    (все обновления чата приходят в этот процесс), иначе изменения другой реплики были бы не видны до конца
+    `cache_ttl`. Записи, не обновлявшиеся дольше `ttl`, считаются отсутствующими и удаляются пачками
+    в `sweep()`. Пустые записи (нет ни состояния, ни данных) удаляются сразу.
+    """
+
+    def __init__(
+        self,
+        ttl: timedelta,
+        cache_size: int,
+        cache_ttl: float,
+        sweep_batch_size: int,
+        chat_affinity: bool = True,
+        key_builder: KeyBuilder | None = None,
+    ) -> None:
+        self.ttl = ttl
+        self.sweep_batch_size = sweep_batch_size
+        self.key_builder = key_builder or DefaultKeyBuilder()
+        self.cache: TTLCache[str, tuple[str | None, dict[str, Any]]] | None = (
+            TTLCache(maxsize=cache_size, ttl=cache_ttl) if chat_affinity else None
+        )
+
+    async def _load(self, key: str) -> tuple[str | None, dict[str, Any]]:
+        record = self.cache.get(key) if self.cache is not None else None
+        if record is None:
+            async with db.async_session() as session:
+                fsm_record = await FSMRecordManager(session).get_by_key(key, self.ttl)
+            record = (fsm_record.state, fsm_record.data) if fsm_record else (None, {})
+            if self.cache is not None:
+                self.cache.set(key, record)
+        return record
+
+    async def _save(self, key: str, state: str | None, data: dict[str, Any]) -> None:
+        async with db.async_session() as session:
+            manager = FSMRecordManager(session)
+            if state is None and not data:
+                await manager.delete_by_key(key)
+            else:
+                await manager.upsert(key, state, data)
+        if self.cache is not None:
+            self.cache.set(key, (state, data))
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        storage_key = self.key_builder.build(key)
+        _, data = await self._load(storage_key)
+        await self._save(storage_key, state.state if isinstance(state, State) else state, data)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        state, _ = await self._load(self.key_builder.build(key))
+        return state
+
+    async def set_data(self, key: StorageKey, data: dict[str, Any]) -> None:
+        storage_key = self.key_builder.build(key)
+        state, _ = await self._load(storage_key)
+        await self._save(storage_key, state, copy.deepcopy(data))
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        _, data = await self._load(self.key_builder.build(key))
+        return copy.deepcopy(data)
+
+    async def sweep(self) -> None:
+        async with db.async_session() as session:
+            deleted = await FSMRecordManager(session).delete_expired(self.ttl, self.sweep_batch_size)
+        if deleted:
+            logger.info('Deleted %s expired FSM states', deleted)
+
+    async def close(self) -> None:
+        if self.cache is not None:
+            self.cache.clear()
+
+
+storage = DatabaseStorage(
+    ttl=timedelta(seconds=FSM_STATE_TTL),
+    cache_size=FSM_CACHE_SIZE,
+    cache_ttl=FSM_CACHE_TTL,
+    sweep_batch_size=FSM_SWEEP_BATCH_SIZE,
+    chat_affinity=FSM_CHAT_AFFINITY,
+)
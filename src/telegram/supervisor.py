@@ -0,0 +1,349 @@
+import asyncio
+import os
+import secrets
+import signal
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from aiogram import Bot
+
+import httpx
+from aiohttp import web
+
+from constants import (
+    SUPERVISOR_FORWARD_QUEUE_SIZE,
+    SUPERVISOR_HEALTH_FAILURES,
+    SUPERVISOR_HEALTH_INTERVAL,
+    SUPERVISOR_RESTART_DELAY,
+    SUPERVISOR_STOP_TIMEOUT,
+    WEBHOOK_ENABLED,
+    WEBHOOK_HEALTH_PATH,
+    WEBHOOK_HOST,
+    WEBHOOK_PATH,
+    WEBHOOK_PORT,
+    WEBHOOK_SECRET,
+    WEBHOOK_URL,
+    WORKER_BASE_PORT,
+    WORKERS,
+)
+from core.loggers import main_logger as logger
+from telegram.webhook import SECRET_HEADER
+
+MAIN_PATH = Path(__file__).resolve().parent.parent / 'main.py'
+ALLOWED_UPDATES = ['message', 'callback_query']
+
+
+def get_update_chat_id(update: dict[str, Any]) -> int | None:
+    """Чат, к которому относится обновление; по нему выбирается воркер. `None` — обновление без чата и автора."""
+    for key in ('message', 'edited_message', 'channel_post', 'edited_channel_post'):
+        if key in update:
+            return update[key]['chat']['id']
+    callback_query = update.get('callback_query')
+    if callback_query:
+        if callback_query.get('message'):
+            return callback_query['message']['chat']['id']
+        return callback_query['from']['id']
+    for value in update.values():
+        if isinstance(value, dict) and isinstance(value.get('from'), dict):
+            return value['from']['id']
+    return None
+
+
+def is_retryable_forward_error(error: httpx.HTTPError) -> bool:
+    """Ошибка недоступности воркера, а не обработки конкретного обновления."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 503
+    return isinstance(error, httpx.TransportError)
+
+
+@dataclass
+class WorkerState:
+    index: int
+    port: int
+    queue: asyncio.Queue[dict[str, Any]]
+    process: asyncio.subprocess.Process | None = None
+    started_at: float = 0.0
+    restarts: int = 0
+    forwarded: int = 0
+    dropped: int = 0
+    overflowed: int = 0
+    health: dict[str, Any] = field(default_factory=dict)
+    health_failures: int = 0
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.port}'
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+
+class Supervisor:
+    """
+    Запускает `workers` процессов бота и распределяет между ними обновления Telegram по `chat_id`.
+
+    Каждый воркер — обычный `main.py` в режиме webhook на локальном порту. Все обновления одного чата
+    попадают в один воркер и пересылаются ему по порядку, поэтому состояние FSM и порядок сообщений
+    в чате сохраняются. Супервизор сам получает обновления (long polling или публичный webhook),
+    проверяет здоровье воркеров, перезапускает упавшие и по SIGHUP перезапускает их по одному.
+    """
+
+    def __init__(self, bot: Bot, workers: int, base_port: int) -> None:
+        self.bot = bot
+        self.secret = secrets.token_urlsafe(32)
+        self.workers = [
+            WorkerState(index, base_port + index, asyncio.Queue(maxsize=SUPERVISOR_FORWARD_QUEUE_SIZE))
+            for index in range(workers)
+        ]
+        self.stopping = False
+        self._restarting: set[int] = set()
+        self._tasks: list[asyncio.Task] = []
+        self._background: set[asyncio.Task] = set()
+        self._client = httpx.AsyncClient(timeout=httpx.Timeout(30, connect=2))
+
+    def shard(self, update: dict[str, Any]) -> WorkerState:
+        chat_id = get_update_chat_id(update)
+        # Обновления без чата не связаны с состоянием FSM, их распределяем равномерно по update_id.
+        key = chat_id if chat_id is not None else update.get('update_id', 0)
+        return self.workers[key % len(self.workers)]
+
+    def route(self, update: dict[str, Any]) -> bool:
+        """
+        Ставит обновление в очередь его шарда без ожидания: зависший воркер не должен останавливать
+        получение обновлений для остальных шардов. Возвращает `False`, если очередь шарда переполнена.
+        """
+        worker = self.shard(update)
+        try:
+            worker.queue.put_nowait(update)
+        except asyncio.QueueFull:
+            worker.overflowed += 1
+            logger.error('Queue of worker %s is full, update %s was not queued', worker.index, update.get('update_id'))
+            return False
+        return True
+
+    def worker_env(self, worker: WorkerState) -> dict[str, str]:
+        env = dict(os.environ)
+        env.update(
+            WORKERS=str(len(self.workers)),
+            WORKER_INDEX=str(worker.index),
+            WEBHOOK_ENABLED='1',
+            WEBHOOK_HOST='127.0.0.1',
+            WEBHOOK_PORT=str(worker.port),
+            WEBHOOK_PATH=WEBHOOK_PATH,
+            WEBHOOK_URL='',
+            WEBHOOK_SECRET=self.secret,
+        )
+        return env
+
+    async def start_worker(self, worker: WorkerState) -> None:
+        worker.process = await asyncio.create_subprocess_exec(
+            sys.executable, str(MAIN_PATH), env=self.worker_env(worker), cwd=MAIN_PATH.parent
+        )
+        worker.started_at = time.monotonic()
+        worker.health = {}
+        worker.health_failures = 0
+        logger.info('Worker %s started with pid %s on port %s', worker.index, worker.process.pid, worker.port)
+
+    async def stop_worker(self, worker: WorkerState) -> None:
+        if not worker.alive:
+            return
+        worker.process.terminate()  # type: ignore[union-attr]
+        try:
+            await asyncio.wait_for(worker.process.wait(), timeout=SUPERVISOR_STOP_TIMEOUT)  # type: ignore[union-attr]
+        except asyncio.TimeoutError:
+            logger.warning('Worker %s did not stop in %s s, killing it', worker.index, SUPERVISOR_STOP_TIMEOUT)
+            worker.process.kill()  # type: ignore[union-attr]
+            await worker.process.wait()  # type: ignore[union-attr]
+
+    async def restart_worker(self, worker: WorkerState) -> None:
+        self._restarting.add(worker.index)
+        try:
+            await self.stop_worker(worker)
+            worker.restarts += 1
+            await self.start_worker(worker)
+            await self.wait_healthy(worker)
+        finally:
+            self._restarting.discard(worker.index)
+
+    async def rolling_restart(self) -> None:
+        """Перезапускает воркеры по одному: обновления остальных шардов обрабатываются без перерыва."""
+        logger.info('Rolling restart of %s workers', len(self.workers))
+        for worker in self.workers:
+            if self.stopping:
+                return
+            await self.restart_worker(worker)
+
+    async def check_health(self, worker: WorkerState) -> bool:
+        try:
+            response = await self._client.get(f'{worker.url}{WEBHOOK_HEALTH_PATH}', timeout=5)
+            response.raise_for_status()
+        except httpx.HTTPError:
+            worker.health_failures += 1
+            return False
+        worker.health = response.json()
+        worker.health_failures = 0
+        return True
+
+    async def wait_healthy(self, worker: WorkerState) -> None:
+        while not self.stopping and worker.alive and not await self.check_health(worker):
+            await asyncio.sleep(0.5)
+
+    async def _forward(self, worker: WorkerState) -> None:
+        """
+        Пересылает обновления шарда строго по порядку. Пока воркер недоступен (нет соединения или 503
+        во время остановки), повторяет попытку; остальные ошибки зависят от самого обновления, поэтому
+        такое обновление пропускается, чтобы не блокировать весь шард.
+        """
+        while True:
+            update = await worker.queue.get()
+            delay = 0.5
+            while True:
+                try:
+                    response = await self._client.post(
+                        f'{worker.url}{WEBHOOK_PATH}', json=update, headers={SECRET_HEADER: self.secret}
+                    )
+                    response.raise_for_status()
+                    worker.forwarded += 1
+                    break
+                except httpx.HTTPError as e:
+                    if not is_retryable_forward_error(e):
+                        worker.dropped += 1
+                        logger.error('Dropping update %s for worker %s: %s', update.get('update_id'), worker.index, e)
+                        break
+                    logger.warning('Forwarding update to worker %s failed: %s', worker.index, e)
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 10)
+            worker.queue.task_done()
+
+    def _spawn(self, coro: Any) -> None:
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _monitor(self) -> None:
+        while not self.stopping:
+            await asyncio.sleep(SUPERVISOR_HEALTH_INTERVAL)
+            for worker in self.workers:
+                if self.stopping or worker.index in self._restarting:
+                    continue
+                if not worker.alive:
+                    returncode = worker.process.returncode if worker.process else None
+                    logger.error('Worker %s exited with code %s, restarting', worker.index, returncode)
+                    await asyncio.sleep(SUPERVISOR_RESTART_DELAY)
+                    self._spawn(self.restart_worker(worker))
+                elif not await self.check_health(worker) and worker.health_failures >= SUPERVISOR_HEALTH_FAILURES:
+                    logger.error('Worker %s failed %s health checks, restarting', worker.index, worker.health_failures)
+                    self._spawn(self.restart_worker(worker))
+
+    async def _poll(self) -> None:
+        try:
+            await self.bot.delete_webhook()
+        except Exception as e:
+            logger.error('Error deleting webhook: %s', e)
+        offset = None
+        while not self.stopping:
+            try:
+                updates = await self.bot.get_updates(offset=offset, timeout=30, allowed_updates=ALLOWED_UPDATES)
+            except Exception as e:
+                logger.error('Error getting updates: %s', e)
+                await asyncio.sleep(SUPERVISOR_RESTART_DELAY)
+                continue
+            for update in updates:
+                # В режиме polling повторно получить одно обновление нельзя: при переполнении оно теряется.
+                self.route(update.model_dump(mode='json', by_alias=True, exclude_none=True))
+                offset = update.update_id + 1
+
+    async def handle_webhook(self, request: web.Request) -> web.Response:
+        if not secrets.compare_digest(request.headers.get(SECRET_HEADER, ''), WEBHOOK_SECRET):
+            return web.Response(status=401, text='Unauthorized')
+        if not self.route(await request.json()):
+            # Telegram повторит доставку обновления позже.
+            return web.Response(status=503, text='Worker queue is full')
+        return web.json_response({})
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        return web.json_response(self.health())
+
+    def health(self) -> dict[str, Any]:
+        now = time.monotonic()
+        return {
+            'status': 'ok' if all(worker.alive for worker in self.workers) else 'degraded',
+            'workers': [
+                {
+                    'index': worker.index,
+                    'pid': worker.process.pid if worker.process else None,
+                    'alive': worker.alive,
+                    'uptime': round(now - worker.started_at) if worker.alive else 0,
+                    'restarts': worker.restarts,
+                    'queued': worker.queue.qsize(),
+                    'forwarded': worker.forwarded,
+                    'dropped': worker.dropped,
+                    'overflowed': worker.overflowed,
+                    'health': worker.health,
+                }
+                for worker in self.workers
+            ],
+        }
+
+    async def run(self) -> None:
+        if WEBHOOK_ENABLED and not WEBHOOK_SECRET:
+            raise ValueError('WEBHOOK_SECRET environment variable is not set.')
+        for worker in self.workers:
+            await self.start_worker(worker)
+        app = web.Application()
+        app.router.add_get(WEBHOOK_HEALTH_PATH, self.handle_health)
+        if WEBHOOK_ENABLED:
+            app.router.add_post(WEBHOOK_PATH, self.handle_webhook)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+        logger.info('Supervisor listening on %s:%s with %s workers', WEBHOOK_HOST, WEBHOOK_PORT, len(self.workers))
+
+        await asyncio.gather(*(self.wait_healthy(worker) for worker in self.workers))
+        self._tasks = [asyncio.create_task(self._forward(worker)) for worker in self.workers]
+        self._tasks.append(asyncio.create_task(self._monitor()))
+        if WEBHOOK_ENABLED:
+            if WEBHOOK_URL:
+                await self.bot.set_webhook(
+                    url=f'{WEBHOOK_URL.rstrip("/")}{WEBHOOK_PATH}',
+                    secret_token=WEBHOOK_SECRET,
+                    allowed_updates=ALLOWED_UPDATES,
+                )
+        else:
+            self._tasks.append(asyncio.create_task(self._poll()))
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGINT, stop.set)
+        loop.add_signal_handler(signal.SIGTERM, stop.set)
+        loop.add_signal_handler(signal.SIGHUP, lambda: self._spawn(self.rolling_restart()))
+        try:
+            await stop.wait()
+        finally:
+            await self.shutdown(runner)
+
+    async def shutdown(self, runner: web.AppRunner) -> None:
+        logger.info('Stopping supervisor')
+        self.stopping = True
+        await runner.cleanup()
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(worker.queue.join() for worker in self.workers)), timeout=SUPERVISOR_STOP_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            logger.warning('Some updates were not forwarded before shutdown')
+        tasks = [*self._tasks, *self._background]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.gather(*(self.stop_worker(worker) for worker in self.workers))
+        await self._client.aclose()
+        await self.bot.session.close()
+
+
+async def run_supervisor(bot: Bot) -> None:
+    await Supervisor(bot, workers=WORKERS, base_port=WORKER_BASE_PORT).run()
@@ -0,0 +1,107 @@
+import asyncio
+import signal
+from typing import Any
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+from aiohttp import web
+
+from constants import (
+    WEBHOOK_DRAIN_TIMEOUT,
+    WEBHOOK_HEALTH_PATH,
+    WEBHOOK_HOST,
+    WEBHOOK_PATH,
+    WEBHOOK_PORT,
+    WEBHOOK_SECRET,
+    WEBHOOK_URL,
+)
+from core.loggers import main_logger as logger
+from core.router import model_router
+from telegram.sender import sender
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+class DrainingRequestHandler(SimpleRequestHandler):
+    """Перед закрытием сессии бота дожидается обработки уже принятых обновлений (не дольше `drain_timeout`)."""
+
+    def __init__(self, *args: Any, drain_timeout: float, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.drain_timeout = drain_timeout
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._background_feed_update_tasks)
+
+    async def close(self) -> None:
+        tasks = set(self._background_feed_update_tasks)
+        if tasks:
+            logger.info('Waiting for %s in-flight updates', len(tasks))
+            _, pending = await asyncio.wait(tasks, timeout=self.drain_timeout)
+            if pending:
+                logger.warning('%s updates were not processed before shutdown', len(pending))
+        await super().close()
+
+
+def create_app(dispatcher: Dispatcher, bot: Bot) -> web.Application:
+    """aiohttp-приложение с маршрутом для обновлений Telegram и эндпоинтом проверки здоровья."""
+    if not WEBHOOK_SECRET:
+        raise ValueError('WEBHOOK_SECRET environment variable is not set.')
+    app = web.Application()
+    handler = DrainingRequestHandler(
+        dispatcher=dispatcher,
+        bot=bot,
+        secret_token=WEBHOOK_SECRET,
+        drain_timeout=WEBHOOK_DRAIN_TIMEOUT,
+    )
+    handler.register(app, path=WEBHOOK_PATH)
+
+    async def health(request: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                'status': 'ok',
+                'gemini_available': model_router.has_healthy_model(),
+                'in_flight_updates': handler.in_flight,
+                'outbound_queue': sender.depth,
+            }
+        )
+
+    app.router.add_get(WEBHOOK_HEALTH_PATH, health)
+    setup_application(app, dispatcher, bot=bot)
+    return app
+
+
+async def run_webhook(dispatcher: Dispatcher, bot: Bot) -> None:
+    """
+    Запускает webhook-сервер и работает до SIGINT/SIGTERM.
+
+    При остановке сервер перестаёт принимать новые запросы, дожидается обработки принятых обновлений
+    и только потом закрывает сессию бота. Webhook в Telegram не удаляется, чтобы другие экземпляры
+    за балансировщиком продолжали получать обновления.
+    """
+    app = create_app(dispatcher, bot)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT)
+    await site.start()
+    logger.info('Webhook server listening on %s:%s%s', WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_PATH)
+    if WEBHOOK_URL:
+        await bot.set_webhook(
+            url=f'{WEBHOOK_URL.rstrip("/")}{WEBHOOK_PATH}',
+            secret_token=WEBHOOK_SECRET,
+            allowed_updates=dispatcher.resolve_used_update_types(),
+        )
+        logger.info('Webhook registered at %s', WEBHOOK_URL)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.remove_signal_handler(sig)
+        logger.info('Stopping webhook server')
+        await runner.cleanup()
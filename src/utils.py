@@ -9,6 +9,10 @@ def has_russian(text: str) -> bool:
     return bool(re.search(r'[А-Яа-яЁё]', text))
 
 
+def normalize_text(text: str) -> str:
+    return ' '.join(text.lower().split())
+
+
 def _text_to_speech_sync(text: str, lang: str = 'en') -> bytes:
     tts = gTTS(text, lang=lang)
     audio_file = BytesIO()